@@ -1,10 +1,28 @@
 """Cerebrus API client for user interaction and credential collection."""
 
-import requests
-import json
+import atexit
+import httpx
+import orjson
+import mimetypes
+import os
 from typing import Dict, Any, Optional
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from config import Config
 
+# Only connection problems and 429/5xx responses are retried; other 4xx
+# responses mean the request itself is wrong and fail immediately
+retry_transient = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=0.5, max=8),
+    retry=retry_if_exception_type((httpx.TransportError, httpx.HTTPStatusError)),
+    reraise=True
+)
+
+def _raise_for_transient(response: httpx.Response):
+    """Raise HTTPStatusError for responses that are worth retrying."""
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+
 class CerebrusClient:
     """Client for interacting with the Cerebrus API."""
     
@@ -12,10 +30,28 @@ class CerebrusClient:
         """Initialize the Cerebrus client."""
         self.api_key = Config.CEREBRUS_API_KEY
         self.base_url = Config.CEREBRUS_BASE_URL
+        # Content-Type is set per request by httpx (JSON body or multipart upload)
         self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {self.api_key}"
         }
+        
+        # Pooled HTTP/2 client so repeated calls reuse the warm TLS connection
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=30.0
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+        atexit.register(self.close)
+    
+    def close(self):
+        """Close the underlying HTTP connection pool."""
+        self.client.close()
     
     def collect_user_input(self, session_id: str) -> Dict[str, Any]:
         """Collect user input for Instagram ad generation."""
@@ -60,24 +96,32 @@ class CerebrusClient:
     def upload_image(self, session_id: str, image_path: str) -> str:
         """Upload an image via Cerebrus API."""
         try:
-            with open(image_path, 'rb') as image_file:
-                files = {'image': image_file}
-                headers = {"Authorization": f"Bearer {self.api_key}"}
-                
-                response = requests.post(
-                    f"{self.base_url}/upload/image",
-                    files=files,
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    return response.json().get("image_url")
-                else:
-                    raise Exception(f"Image upload failed: {response.text}")
+            response = self._post_image(image_path)
+            
+            if response.status_code == 200:
+                return response.json().get("image_url")
+            else:
+                raise Exception(f"Image upload failed: {response.text}")
                     
         except Exception as e:
             raise Exception(f"Failed to upload image: {str(e)}")
     
+    @retry_transient
+    def _post_image(self, image_path: str) -> httpx.Response:
+        """POST an image file, reopening it on each attempt so retries send the full body."""
+        content_type = mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+        
+        with open(image_path, 'rb') as image_file:
+            # httpx streams file fields from disk in chunks instead of
+            # buffering the whole image to compute the body
+            files = {'image': (os.path.basename(image_path), image_file, content_type)}
+            
+            response = self.client.post("/upload/image", files=files)
+        
+        _raise_for_transient(response)
+        return response
+    
+    @retry_transient
     def _send_to_cerebrus(self, session_id: str, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Send data to Cerebrus API."""
         payload = {
@@ -86,27 +130,25 @@ class CerebrusClient:
             "data": data
         }
         
-        response = requests.post(
-            f"{self.base_url}/conversation",
-            headers=self.headers,
-            json=payload
+        response = self.client.post(
+            "/conversation",
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"}
         )
+        _raise_for_transient(response)
         
         if response.status_code == 200:
-            return response.json()
+            return orjson.loads(response.content)
         else:
             raise Exception(f"Cerebrus API error: {response.text}")
     
     def get_conversation_state(self, session_id: str) -> Dict[str, Any]:
         """Get the current conversation state."""
         try:
-            response = requests.get(
-                f"{self.base_url}/conversation/{session_id}",
-                headers=self.headers
-            )
+            response = self.client.get(f"/conversation/{session_id}")
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 raise Exception(f"Failed to get conversation state: {response.text}")
                 
@@ -116,10 +158,7 @@ class CerebrusClient:
     def end_conversation(self, session_id: str) -> bool:
         """End the conversation session."""
         try:
-            response = requests.delete(
-                f"{self.base_url}/conversation/{session_id}",
-                headers=self.headers
-            )
+            response = self.client.delete(f"/conversation/{session_id}")
             
             return response.status_code == 200
             
@@ -20,6 +20,7 @@ class Config:
     INSTAGRAM_ACCESS_TOKEN = os.getenv('INSTAGRAM_ACCESS_TOKEN')
     INSTAGRAM_APP_ID = os.getenv('INSTAGRAM_APP_ID')
     INSTAGRAM_APP_SECRET = os.getenv('INSTAGRAM_APP_SECRET')
+    INSTAGRAM_CALLS_PER_HOUR = int(os.getenv('INSTAGRAM_CALLS_PER_HOUR', '200'))  # per endpoint
     
     # Storage Configuration
     STORAGE_PATH = os.getenv('STORAGE_PATH', './data')
@@ -31,23 +32,23 @@ class Config:
     MAX_CAPTION_LENGTH = 2200
     MAX_HASHTAGS = 30
     
+    # Required API settings; MISSING_VARS is filled in once below
+    REQUIRED_VARS = (
+        'CEREBRUS_API_KEY',
+        'GEMINI_API_KEY',
+        'INSTAGRAM_ACCESS_TOKEN',
+        'INSTAGRAM_APP_ID',
+        'INSTAGRAM_APP_SECRET'
+    )
+    MISSING_VARS = ()
+    
     @classmethod
     def validate(cls):
         """Validate that all required configuration is present."""
-        required_vars = [
-            'CEREBRUS_API_KEY',
-            'GEMINI_API_KEY',
-            'INSTAGRAM_ACCESS_TOKEN',
-            'INSTAGRAM_APP_ID',
-            'INSTAGRAM_APP_SECRET'
-        ]
-        
-        missing_vars = []
-        for var in required_vars:
-            if not getattr(cls, var):
-                missing_vars.append(var)
+        if cls.MISSING_VARS:
+            raise ValueError(f"Missing required environment variables: {', '.join(cls.MISSING_VARS)}")
         
-        if missing_vars:
-            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
-        
-        return True
\ No newline at end of file
+        return True
+
+# Values are frozen at import, so the missing set only needs computing once
+Config.MISSING_VARS = tuple(var for var in Config.REQUIRED_VARS if not getattr(Config, var))
@@ -1,11 +1,105 @@
 """Gemini API client for content generation."""
 
+import asyncio
+import functools
+import hashlib
 import google.generativeai as genai
-from typing import Dict, Any, List, Optional
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from typing import Dict, Any, List, Optional, Tuple
 from config import Config
 import base64
 import io
-from PIL import Image
+import json
+import mimetypes
+import os
+import re
+import time
+from PIL import Image, ImageDraw, ImageFont
+
+PLACEHOLDER_SIZE = (1080, 1080)
+PLACEHOLDER_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# One tag per match, with or without a leading '#'
+HASHTAG_RE = re.compile(r'#?(\w+)')
+
+# Tags written inline in free text, where only '#' marks a word as a tag
+INLINE_HASHTAG_RE = re.compile(r'[ \t]*#(\w+)')
+
+# Prompt building is on every generation path, so the instruction tables and
+# templates are built once here rather than per call.
+TONE_INSTRUCTIONS = {
+    "professional": "Write in a professional, business-like tone",
+    "casual": "Write in a casual, friendly tone",
+    "friendly": "Write in a warm, approachable tone",
+    "energetic": "Write in an energetic, exciting tone"
+}
+
+STYLE_INSTRUCTIONS = {
+    "modern": "modern, clean, minimalist design",
+    "vintage": "vintage, retro aesthetic",
+    "luxury": "luxury, premium, high-end look",
+    "playful": "fun, colorful, playful design"
+}
+
+CAPTION_PROMPT_TEMPLATE = """
+        {tone_instruction} for an Instagram advertisement.
+        
+        Product/Service: {description}
+        Target Audience: {target_audience}
+        
+        Create an engaging Instagram caption that:
+        1. Captures attention in the first line
+        2. Describes the product/service benefits
+        3. Includes a call-to-action
+        4. Is optimized for Instagram engagement
+        5. Stays within {max_caption_length} characters
+        
+        Make it compelling and authentic.
+        """
+
+IMAGE_PROMPT_TEMPLATE = """
+        Create a high-quality Instagram advertisement image for:
+        Product: {description}
+        Target Audience: {target_audience}
+        Style: {style_instruction}
+        
+        The image should be:
+        - Instagram-ready (square format, high resolution)
+        - Visually appealing and professional
+        - Relevant to the product description
+        - Optimized for social media engagement
+        """
+
+# Rate limits and server-side failures are worth another attempt; anything
+# else (bad request, auth, blocked prompt) fails straight away
+TRANSIENT_GEMINI_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded
+)
+
+retry_transient = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=0.5, max=8),
+    retry=retry_if_exception_type(TRANSIENT_GEMINI_ERRORS),
+    reraise=True
+)
+
+@functools.lru_cache(maxsize=4)
+def _get_font(size: int = 40):
+    """Load the placeholder font once per size instead of re-parsing the TTF per image."""
+    try:
+        return ImageFont.truetype(PLACEHOLDER_FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=2)
+def _get_blank_image(color: str) -> Image.Image:
+    """Return a cached blank canvas; callers must .copy() before drawing on it."""
+    return Image.new('RGB', PLACEHOLDER_SIZE, color=color)
 
 class GeminiClient:
     """Client for interacting with the Gemini API for content generation."""
@@ -23,20 +117,20 @@ class GeminiClient:
         """Generate an engaging Instagram caption based on product details."""
         try:
             prompt = self._build_caption_prompt(product_details, tone)
+            response = self._generate(prompt)
             
-            response = self.text_model.generate_content(prompt)
-            
-            if response.text:
-                # Clean up the response
-                caption = response.text.strip()
+            return self._finalize_caption(response.text)
                 
-                # Ensure caption length is within Instagram limits
-                if len(caption) > Config.MAX_CAPTION_LENGTH:
-                    caption = caption[:Config.MAX_CAPTION_LENGTH-3] + "..."
-                
-                return caption
-            else:
-                raise Exception("No caption generated")
+        except Exception as e:
+            raise Exception(f"Failed to generate caption: {str(e)}")
+    
+    async def generate_caption_async(self, product_details: Dict[str, Any], tone: str = "professional") -> str:
+        """Async variant of generate_caption."""
+        try:
+            prompt = self._build_caption_prompt(product_details, tone)
+            response = await self._generate_async(prompt)
+            
+            return self._finalize_caption(response.text)
                 
         except Exception as e:
             raise Exception(f"Failed to generate caption: {str(e)}")
@@ -45,18 +139,11 @@ class GeminiClient:
         """Generate an AI-based ad image using Gemini."""
         try:
             prompt = self._build_image_prompt(product_details, style)
+            image_path = self._prepare_image_path(prompt)
             
             # Generate image using text-to-image (this would need to be adapted based on actual Gemini capabilities)
             # For now, we'll simulate image generation
-            response = self.text_model.generate_content(prompt)
-            
-            # In a real implementation, this would generate an actual image
-            # For now, we'll return a placeholder path
-            image_path = f"./generated_images/image_{hash(prompt)}.jpg"
-            
-            # Create the image directory if it doesn't exist
-            import os
-            os.makedirs(os.path.dirname(image_path), exist_ok=True)
+            response = self._generate(prompt)
             
             # Create a placeholder image (in production, this would be the actual generated image)
             self._create_placeholder_image(image_path, product_details)
@@ -66,110 +153,195 @@ class GeminiClient:
         except Exception as e:
             raise Exception(f"Failed to generate image: {str(e)}")
     
+    async def generate_image_async(self, product_details: Dict[str, Any], style: str = "modern") -> str:
+        """Async variant of generate_image."""
+        try:
+            prompt = self._build_image_prompt(product_details, style)
+            image_path = self._prepare_image_path(prompt)
+            
+            response = await self._generate_async(prompt)
+            
+            # PIL rendering is blocking, keep it off the event loop
+            await asyncio.to_thread(self._create_placeholder_image, image_path, product_details)
+            
+            return image_path
+            
+        except Exception as e:
+            raise Exception(f"Failed to generate image: {str(e)}")
+    
     def generate_hashtags(self, product_details: Dict[str, Any], caption: str) -> List[str]:
         """Generate relevant hashtags for the post."""
         try:
-            prompt = f"""
-            Generate {Config.MAX_HASHTAGS} relevant hashtags for an Instagram post about:
-            Product: {product_details.get('description', '')}
-            Target Audience: {product_details.get('target_audience', '')}
-            Caption: {caption}
+            prompt = self._build_hashtag_prompt(product_details, caption)
+            response = self._generate(prompt)
             
-            Return only the hashtags, one per line, without the # symbol.
-            """
+            return self._parse_hashtags(response.text)
+                
+        except Exception as e:
+            print(f"Failed to generate hashtags: {str(e)}")
+            return []
+    
+    async def generate_hashtags_async(self, product_details: Dict[str, Any], caption: str) -> List[str]:
+        """Async variant of generate_hashtags."""
+        try:
+            prompt = self._build_hashtag_prompt(product_details, caption)
+            response = await self._generate_async(prompt)
             
-            response = self.text_model.generate_content(prompt)
-            
-            if response.text:
-                hashtags = [
-                    f"#{tag.strip()}" 
-                    for tag in response.text.strip().split('\n') 
-                    if tag.strip()
-                ]
-                return hashtags[:Config.MAX_HASHTAGS]
-            else:
-                return []
+            return self._parse_hashtags(response.text)
                 
         except Exception as e:
             print(f"Failed to generate hashtags: {str(e)}")
             return []
     
-    def _build_caption_prompt(self, product_details: Dict[str, Any], tone: str) -> str:
-        """Build a prompt for caption generation."""
-        description = product_details.get('description', '')
-        target_audience = product_details.get('target_audience', '')
+    def generate_caption_and_hashtags(self, product_details: Dict[str, Any], tone: str = "professional") -> Tuple[str, List[str]]:
+        """Generate the caption and its hashtags in a single request."""
+        try:
+            prompt = self._build_caption_and_hashtags_prompt(product_details, tone)
+            response = self._generate(prompt)
+            
+            return self._parse_caption_and_hashtags(response.text)
+                
+        except Exception as e:
+            raise Exception(f"Failed to generate caption and hashtags: {str(e)}")
+    
+    async def generate_caption_and_hashtags_async(self, product_details: Dict[str, Any], tone: str = "professional") -> Tuple[str, List[str]]:
+        """Async variant of generate_caption_and_hashtags."""
+        try:
+            prompt = self._build_caption_and_hashtags_prompt(product_details, tone)
+            response = await self._generate_async(prompt)
+            
+            return self._parse_caption_and_hashtags(response.text)
+                
+        except Exception as e:
+            raise Exception(f"Failed to generate caption and hashtags: {str(e)}")
+    
+    @retry_transient
+    def _generate(self, contents, model=None):
+        """Call generate_content, retrying transient API errors with backoff."""
+        return (model or self.text_model).generate_content(contents)
+    
+    @retry_transient
+    async def _generate_async(self, contents, model=None):
+        """Async variant of _generate."""
+        return await (model or self.text_model).generate_content_async(contents)
+    
+    def _finalize_caption(self, text: str) -> str:
+        """Clean up a generated caption and enforce Instagram limits."""
+        if text:
+            # Clean up the response
+            caption = text.strip()
+            
+            # Ensure caption length is within Instagram limits
+            if len(caption) > Config.MAX_CAPTION_LENGTH:
+                caption = caption[:Config.MAX_CAPTION_LENGTH-3] + "..."
+            
+            return caption
+        else:
+            raise Exception("No caption generated")
+    
+    def _parse_hashtags(self, text: str) -> List[str]:
+        """Parse hashtags from model output in one regex pass, dropping repeats."""
+        hashtags = []
+        seen = set()
+        for match in HASHTAG_RE.finditer(text or ""):
+            tag = match.group(1)
+            if tag.lower() not in seen:
+                seen.add(tag.lower())
+                hashtags.append(f"#{tag}")
+                if len(hashtags) >= Config.MAX_HASHTAGS:
+                    break
+        return hashtags
+    
+    def _parse_caption_and_hashtags(self, text: str) -> Tuple[str, List[str]]:
+        """Parse the JSON object returned for a combined caption/hashtag request."""
+        if not text:
+            raise Exception("No caption generated")
         
-        tone_instructions = {
-            "professional": "Write in a professional, business-like tone",
-            "casual": "Write in a casual, friendly tone",
-            "friendly": "Write in a warm, approachable tone",
-            "energetic": "Write in an energetic, exciting tone"
-        }
+        # The model sometimes wraps JSON in a markdown code fence
+        body = text.strip()
+        if body.startswith("```"):
+            body = body.strip("`")
+            if body[:4].lower() == "json":
+                body = body[4:]
+            body = body.strip()
         
-        tone_instruction = tone_instructions.get(tone, tone_instructions["professional"])
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
         
-        prompt = f"""
-        {tone_instruction} for an Instagram advertisement.
+        if not isinstance(data, dict):
+            # Not the JSON we asked for: use the reply as the caption and any
+            # inline #tags in it as the hashtags, rather than lose the post
+            hashtags = self._parse_hashtags(" ".join(INLINE_HASHTAG_RE.findall(body)))
+            return self._finalize_caption(INLINE_HASHTAG_RE.sub("", body)), hashtags
         
-        Product/Service: {description}
-        Target Audience: {target_audience}
+        tags = data.get("hashtags") or []
+        if isinstance(tags, str):
+            tags = [tags]
+        caption = self._finalize_caption(data.get("caption", ""))
+        hashtags = self._parse_hashtags("\n".join(str(tag) for tag in tags))
+        return caption, hashtags
+    
+    def _prepare_image_path(self, prompt: str) -> str:
+        """Return a new output path for a generated image, creating its directory."""
+        # hash() is salted per process, so the prompt part is a stable digest.
+        # Every run renders a new image, and the time suffix keeps it from
+        # overwriting a file that earlier images/posts rows point at.
+        digest = hashlib.blake2b(prompt.encode('utf-8'), digest_size=12).hexdigest()
+        image_path = f"./generated_images/image_{digest}_{time.time_ns()}.jpg"
         
-        Create an engaging Instagram caption that:
-        1. Captures attention in the first line
-        2. Describes the product/service benefits
-        3. Includes a call-to-action
-        4. Is optimized for Instagram engagement
-        5. Stays within {Config.MAX_CAPTION_LENGTH} characters
+        # Create the image directory if it doesn't exist
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
         
-        Make it compelling and authentic.
-        """
+        return image_path
+    
+    def _build_hashtag_prompt(self, product_details: Dict[str, Any], caption: str) -> str:
+        """Build a prompt for hashtag generation."""
+        return f"""
+            Generate {Config.MAX_HASHTAGS} relevant hashtags for an Instagram post about:
+            Product: {product_details.get('description', '')}
+            Target Audience: {product_details.get('target_audience', '')}
+            Caption: {caption}
+            
+            Return only the hashtags, one per line, without the # symbol.
+            """
+    
+    def _build_caption_and_hashtags_prompt(self, product_details: Dict[str, Any], tone: str) -> str:
+        """Build a prompt asking for the caption and hashtags as one JSON object."""
+        return self._build_caption_prompt(product_details, tone) + f"""
+        Also suggest {Config.MAX_HASHTAGS} relevant hashtags for the post.
         
-        return prompt
+        Respond with only a JSON object, no other text, in this form:
+        {{"caption": "<the caption>", "hashtags": ["tag1", "tag2"]}}
+        """
+    
+    def _build_caption_prompt(self, product_details: Dict[str, Any], tone: str) -> str:
+        """Build a prompt for caption generation."""
+        return CAPTION_PROMPT_TEMPLATE.format(
+            tone_instruction=TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS["professional"]),
+            description=product_details.get('description', ''),
+            target_audience=product_details.get('target_audience', ''),
+            max_caption_length=Config.MAX_CAPTION_LENGTH
+        )
     
     def _build_image_prompt(self, product_details: Dict[str, Any], style: str) -> str:
         """Build a prompt for image generation."""
-        description = product_details.get('description', '')
-        target_audience = product_details.get('target_audience', '')
-        
-        style_instructions = {
-            "modern": "modern, clean, minimalist design",
-            "vintage": "vintage, retro aesthetic",
-            "luxury": "luxury, premium, high-end look",
-            "playful": "fun, colorful, playful design"
-        }
-        
-        style_instruction = style_instructions.get(style, style_instructions["modern"])
-        
-        prompt = f"""
-        Create a high-quality Instagram advertisement image for:
-        Product: {description}
-        Target Audience: {target_audience}
-        Style: {style_instruction}
-        
-        The image should be:
-        - Instagram-ready (square format, high resolution)
-        - Visually appealing and professional
-        - Relevant to the product description
-        - Optimized for social media engagement
-        """
-        
-        return prompt
+        return IMAGE_PROMPT_TEMPLATE.format(
+            description=product_details.get('description', ''),
+            target_audience=product_details.get('target_audience', ''),
+            style_instruction=STYLE_INSTRUCTIONS.get(style, STYLE_INSTRUCTIONS["modern"])
+        )
     
     def _create_placeholder_image(self, image_path: str, product_details: Dict[str, Any]):
         """Create a placeholder image (in production, this would be replaced with actual AI-generated image)."""
         try:
             # Create a simple placeholder image
-            img = Image.new('RGB', (1080, 1080), color='lightblue')
+            img = _get_blank_image('lightblue').copy()
             
             # Add some text to the image
-            from PIL import ImageDraw, ImageFont
             draw = ImageDraw.Draw(img)
-            
-            # Try to use a default font
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 40)
-            except:
-                font = ImageFont.load_default()
+            font = _get_font(40)
             
             text = product_details.get('description', 'Product Advertisement')[:50]
             draw.text((50, 500), text, fill='black', font=font)
@@ -179,27 +351,32 @@ class GeminiClient:
         except Exception as e:
             print(f"Failed to create placeholder image: {str(e)}")
             # Create a simple colored rectangle as fallback
-            img = Image.new('RGB', (1080, 1080), color='lightgray')
-            img.save(image_path)
+            _get_blank_image('lightgray').save(image_path)
     
     def analyze_image(self, image_path: str) -> Dict[str, Any]:
         """Analyze an uploaded image to understand its content."""
         try:
+            # Send the encoded file as-is; decoding it with PIL only for the
+            # SDK to re-encode it again is wasted work
             with open(image_path, 'rb') as image_file:
-                image = Image.open(image_file)
-                
-                response = self.image_model.generate_content([
-                    "Analyze this image and describe what you see. Focus on:",
-                    "1. Main subject/object",
-                    "2. Colors and mood",
-                    "3. Style and composition",
-                    "4. Potential for Instagram advertising"
-                ], image)
-                
-                return {
-                    "description": response.text,
-                    "analysis": "Image analysis completed"
+                image_blob = {
+                    "mime_type": mimetypes.guess_type(image_path)[0] or "image/jpeg",
+                    "data": image_file.read()
                 }
+            
+            response = self._generate([
+                "Analyze this image and describe what you see. Focus on:",
+                "1. Main subject/object",
+                "2. Colors and mood",
+                "3. Style and composition",
+                "4. Potential for Instagram advertising",
+                image_blob
+            ], model=self.image_model)
+            
+            return {
+                "description": response.text,
+                "analysis": "Image analysis completed"
+            }
                 
         except Exception as e:
             raise Exception(f"Failed to analyze image: {str(e)}")
\ No newline at end of file
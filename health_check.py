@@ -1,20 +1,55 @@
 """Health check endpoint for the Instagram Advertisement Agent."""
 
 from flask import Flask, jsonify
+from flask.json.provider import JSONProvider
+import orjson
 import os
-import json
 from datetime import datetime
 from config import Config
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify skips the stdlib encoder."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype="application/json"
+        )
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+STORAGE_FILES = frozenset({
+    "history.db"
+})
+
+_storage = None
+
+def get_storage():
+    """Return the process-wide ContentStorage, so requests reuse its open database connection."""
+    global _storage
+    if _storage is None:
+        from storage import ContentStorage
+        _storage = ContentStorage(Config.STORAGE_PATH)
+    return _storage
 
 @app.route('/health')
 def health_check():
     """Health check endpoint."""
     try:
-        # Check if data directory exists
+        # List the data directory once rather than stat-ing each storage file
         data_dir = Config.STORAGE_PATH
-        if not os.path.exists(data_dir):
+        try:
+            with os.scandir(data_dir) as entries:
+                present = {entry.name for entry in entries}
+        except FileNotFoundError:
             return jsonify({
                 "status": "unhealthy",
                 "message": "Data directory not found",
@@ -22,40 +57,19 @@ def health_check():
             }), 500
         
         # Check if storage files exist
-        storage_files = [
-            "prompts_history.json",
-            "captions_history.json", 
-            "images_history.json",
-            "posts_history.json"
-        ]
-        
-        for file_name in storage_files:
-            file_path = os.path.join(data_dir, file_name)
-            if not os.path.exists(file_path):
-                return jsonify({
-                    "status": "unhealthy",
-                    "message": f"Storage file {file_name} not found",
-                    "timestamp": datetime.now().isoformat()
-                }), 500
+        missing_files = STORAGE_FILES - present
+        if missing_files:
+            return jsonify({
+                "status": "unhealthy",
+                "message": f"Storage file(s) {', '.join(sorted(missing_files))} not found",
+                "timestamp": datetime.now().isoformat()
+            }), 500
         
         # Check API configurations
-        required_configs = [
-            'CEREBRUS_API_KEY',
-            'GEMINI_API_KEY', 
-            'INSTAGRAM_ACCESS_TOKEN',
-            'INSTAGRAM_APP_ID',
-            'INSTAGRAM_APP_SECRET'
-        ]
-        
-        missing_configs = []
-        for config in required_configs:
-            if not getattr(Config, config):
-                missing_configs.append(config)
-        
-        if missing_configs:
+        if Config.MISSING_VARS:
             return jsonify({
                 "status": "unhealthy",
-                "message": f"Missing configuration: {', '.join(missing_configs)}",
+                "message": f"Missing configuration: {', '.join(Config.MISSING_VARS)}",
                 "timestamp": datetime.now().isoformat()
             }), 500
         
@@ -77,22 +91,21 @@ def health_check():
 def status():
     """Detailed status endpoint."""
     try:
-        from storage import ContentStorage
-        
-        storage = ContentStorage(Config.STORAGE_PATH)
+        storage = get_storage()
         
         # Get recent activity
         recent_prompts = storage.get_recent_prompts(5)
         recent_captions = storage.get_recent_captions(5)
         recent_posts = storage.get_recent_posts(5)
+        counts = storage.counts()
         
         return jsonify({
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
             "storage": {
-                "prompts_count": len(recent_prompts),
-                "captions_count": len(recent_captions),
-                "posts_count": len(recent_posts)
+                "prompts_count": counts["prompts"],
+                "captions_count": counts["captions"],
+                "posts_count": counts["posts"]
             },
             "recent_activity": {
                 "prompts": recent_prompts,
@@ -109,4 +122,17 @@ def status():
         }), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=False)
\ No newline at end of file
+    if os.getenv('FLASK_DEBUG'):
+        # Werkzeug dev server, for local debugging only
+        app.run(host='0.0.0.0', port=8000, debug=True)
+    else:
+        # Hypercorn serves the WSGI app with HTTP/2 and long-lived keep-alive,
+        # so frequent probes don't pay a handshake each time
+        import asyncio
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config as ServerConfig
+        
+        server_config = ServerConfig()
+        server_config.bind = ["0.0.0.0:8000"]
+        server_config.keep_alive_timeout = 75
+        asyncio.run(serve(app, server_config))
\ No newline at end of file
@@ -1,27 +1,37 @@
 """Main Instagram Advertisement Agent orchestrator."""
 
+import asyncio
+import atexit
+import json
 import os
+import queue
 import sys
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime, timedelta
+from functools import cached_property
 from typing import Dict, Any, Optional
-import schedule
-import time
+from croniter import croniter
 
 from config import Config
 from storage import ContentStorage
-from cerebrus_client import CerebrusClient
-from gemini_client import GeminiClient
-from instagram_client import InstagramClient
 
-# Configure logging
+# Configure logging. Records are queued and written by a listener thread,
+# so logging in the posting path never blocks on file or stdout I/O.
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue,
+    logging.FileHandler('instagram_agent.log'),
+    logging.StreamHandler(sys.stdout),
+    respect_handler_level=True
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('instagram_agent.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
 
 logger = logging.getLogger(__name__)
@@ -29,17 +39,15 @@ logger = logging.getLogger(__name__)
 class InstagramAdvertisementAgent:
     """Main orchestrator for the Instagram Advertisement Agent."""
     
-    def __init__(self):
+    def __init__(self, validate_config: bool = True):
         """Initialize the Instagram Advertisement Agent."""
         try:
-            # Validate configuration
-            Config.validate()
+            # Validate configuration (not needed for storage-only commands)
+            if validate_config:
+                Config.validate()
             
-            # Initialize components
+            # Initialize components; API clients are created on first use
             self.storage = ContentStorage(Config.STORAGE_PATH)
-            self.cerebrus = CerebrusClient()
-            self.gemini = GeminiClient()
-            self.instagram = InstagramClient()
             
             logger.info("Instagram Advertisement Agent initialized successfully")
             
@@ -47,8 +55,30 @@ class InstagramAdvertisementAgent:
             logger.error(f"Failed to initialize Instagram Advertisement Agent: {str(e)}")
             raise
     
+    @cached_property
+    def cerebrus(self):
+        """Cerebrus client, imported and built on first use."""
+        from cerebrus_client import CerebrusClient
+        return CerebrusClient()
+    
+    @cached_property
+    def gemini(self):
+        """Gemini client; google.generativeai and PIL are only imported here."""
+        from gemini_client import GeminiClient
+        return GeminiClient()
+    
+    @cached_property
+    def instagram(self):
+        """Instagram client, imported and built on first use."""
+        from instagram_client import InstagramClient
+        return InstagramClient()
+    
     def run_daily_posting(self):
         """Run the daily posting process."""
+        asyncio.run(self.run_daily_posting_async())
+    
+    async def run_daily_posting_async(self):
+        """Run the daily posting process inside an event loop."""
         try:
             logger.info("Starting daily posting process")
             
@@ -56,14 +86,14 @@ class InstagramAdvertisementAgent:
             user_data = self._collect_user_input()
             
             # Step 2: Generate content
-            content = self._generate_content(user_data)
+            content = await self._generate_content(user_data)
             
             if not content:
                 logger.warning("No content generated, skipping posting")
                 return
             
             # Step 3: Post to Instagram
-            self._post_content(content)
+            await self._post_content(content)
             
             logger.info("Daily posting process completed successfully")
             
@@ -112,43 +142,27 @@ class InstagramAdvertisementAgent:
             logger.error(f"Failed to collect user input: {str(e)}")
             raise
     
-    def _generate_content(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def _generate_content(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Generate content using Gemini API."""
         try:
             product_details = user_data["product_details"]
             image_preferences = user_data["image_preferences"]
             
-            # Generate caption
-            caption = self.gemini.generate_caption(
-                product_details, 
-                product_details.get("tone", "professional")
-            )
-            
-            # Generate hashtags
-            hashtags = self.gemini.generate_hashtags(product_details, caption)
-            
-            # Generate or use uploaded image
-            if image_preferences.get("use_ai_generated", True):
-                image_path = self.gemini.generate_image(
+            # The image doesn't depend on the caption, so generate it while
+            # the caption and hashtags are being produced (in one request)
+            (caption, hashtags), image_path = await asyncio.gather(
+                self.gemini.generate_caption_and_hashtags_async(
                     product_details,
-                    image_preferences.get("style", "modern")
-                )
-            else:
-                # Use uploaded images
-                uploaded_images = image_preferences.get("uploaded_images", [])
-                if uploaded_images:
-                    image_path = uploaded_images[0]
-                else:
-                    logger.warning("No images available, generating AI image")
-                    image_path = self.gemini.generate_image(
-                        product_details,
-                        image_preferences.get("style", "modern")
-                    )
+                    product_details.get("tone", "professional")
+                ),
+                self._resolve_image(product_details, image_preferences)
+            )
             
             # Store content in history
-            prompt_id = len(self.storage._load_json(self.storage.prompts_file))
-            caption_id = self.storage.add_caption(caption, prompt_id, product_details)
-            image_id = self.storage.add_image(image_path, prompt_id, image_preferences)
+            prompt_id = self.storage.latest_prompt_id()
+            caption_id, image_id = self.storage.add_content_bundle(
+                caption, image_path, prompt_id, product_details, image_preferences
+            )
             
             content = {
                 "caption": caption,
@@ -171,30 +185,55 @@ class InstagramAdvertisementAgent:
             logger.error(f"Failed to generate content: {str(e)}")
             return None
     
-    def _post_content(self, content: Dict[str, Any]):
+    async def _resolve_image(self, product_details: Dict[str, Any], image_preferences: Dict[str, Any]) -> str:
+        """Generate an AI image or pick the first uploaded one."""
+        if image_preferences.get("use_ai_generated", True):
+            return await self.gemini.generate_image_async(
+                product_details,
+                image_preferences.get("style", "modern")
+            )
+        
+        # Use uploaded images
+        uploaded_images = image_preferences.get("uploaded_images", [])
+        if uploaded_images:
+            return uploaded_images[0]
+        
+        logger.warning("No images available, generating AI image")
+        return await self.gemini.generate_image_async(
+            product_details,
+            image_preferences.get("style", "modern")
+        )
+    
+    async def _post_content(self, content: Dict[str, Any]):
         """Post content to Instagram."""
         try:
             posting_preferences = content["metadata"]["product_details"]
-            results = {}
+            targets = {}
             
-            # Post to feed
+            # Feed and story posts are independent, so send them concurrently
             if posting_preferences.get("post_to_feed", True):
-                feed_result = self.instagram.post_to_feed(
+                targets["feed"] = self.instagram.apost_to_feed(
                     content["image_path"],
                     content["caption"],
                     content["hashtags"]
                 )
-                results["feed"] = feed_result
-                logger.info(f"Feed post result: {feed_result}")
             
-            # Post to stories
             if posting_preferences.get("post_to_stories", True):
-                story_result = self.instagram.post_to_stories(
+                targets["stories"] = self.instagram.apost_to_stories(
                     content["image_path"],
                     content["caption"]
                 )
-                results["stories"] = story_result
-                logger.info(f"Story post result: {story_result}")
+            
+            try:
+                results = dict(zip(targets, await asyncio.gather(*targets.values())))
+            finally:
+                # The async client's connections die with this event loop
+                await self.instagram.aclose()
+            
+            if "feed" in results:
+                logger.info(f"Feed post result: {results['feed']}")
+            if "stories" in results:
+                logger.info(f"Story post result: {results['stories']}")
             
             # Store posting results
             post_data = {
@@ -214,18 +253,28 @@ class InstagramAdvertisementAgent:
     def schedule_daily_posting(self):
         """Schedule daily posting at 12 AM."""
         try:
-            schedule.every().day.at(Config.POST_TIME).do(self.run_daily_posting)
             logger.info(f"Daily posting scheduled for {Config.POST_TIME}")
-            
-            # Keep the scheduler running
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
+            asyncio.run(self._run_schedule())
                 
         except Exception as e:
             logger.error(f"Failed to schedule daily posting: {str(e)}")
             raise
     
+    async def _run_schedule(self):
+        """Sleep until each cron fire time and run the posting job."""
+        hour, minute = Config.POST_TIME.split(":")
+        fire_times = croniter(f"{int(minute)} {int(hour)} * * *", datetime.now())
+        
+        while True:
+            next_run = fire_times.get_next(datetime)
+            await asyncio.sleep(max(0.0, (next_run - datetime.now()).total_seconds()))
+            
+            try:
+                await self.run_daily_posting_async()
+            except Exception:
+                # Already logged; keep the schedule alive for the next day
+                pass
+    
     def run_manual_posting(self):
         """Run a manual posting process (for testing)."""
         try:
@@ -242,11 +291,12 @@ class InstagramAdvertisementAgent:
             recent_prompts = self.storage.get_recent_prompts(10)
             recent_captions = self.storage.get_recent_captions(10)
             recent_posts = self.storage.get_recent_posts(10)
+            counts = self.storage.counts()
             
             return {
-                "total_prompts": len(recent_prompts),
-                "total_captions": len(recent_captions),
-                "total_posts": len(recent_posts),
+                "total_prompts": counts["prompts"],
+                "total_captions": counts["captions"],
+                "total_posts": counts["posts"],
                 "recent_prompts": recent_prompts,
                 "recent_captions": recent_captions,
                 "recent_posts": recent_posts
@@ -268,13 +318,16 @@ class InstagramAdvertisementAgent:
 def main():
     """Main entry point for the Instagram Advertisement Agent."""
     try:
-        # Initialize the agent
-        agent = InstagramAdvertisementAgent()
+        command = sys.argv[1] if len(sys.argv) > 1 else "manual"
+        
+        # analytics and cleanup only touch local storage, so they skip the
+        # API key check and never load the API clients
+        agent = InstagramAdvertisementAgent(
+            validate_config=command not in ("analytics", "cleanup")
+        )
         
         # Check command line arguments
         if len(sys.argv) > 1:
-            command = sys.argv[1]
-            
             if command == "manual":
                 # Run manual posting
                 agent.run_manual_posting()
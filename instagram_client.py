@@ -1,12 +1,124 @@
 """Instagram posting client using MCP Instagram Module."""
 
-import requests
+import asyncio
+import httpx
 import json
-from typing import Dict, Any, Optional, List
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 from config import Config
 import os
 from datetime import datetime
 
+# Seconds to hold an endpoint after a 429 that doesn't say how long to wait
+DEFAULT_RETRY_AFTER = 60
+
+# Transient statuses (and timeouts) retried for GET requests, with full-jitter
+# exponential backoff
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ATTEMPTS = 4
+RETRY_BACKOFF = 0.3
+
+# Graph API usage (percent of quota) at which an endpoint is held early
+USAGE_HOLD_PERCENT = 95
+
+# In-flight request cap for the async client
+MAX_CONCURRENT_REQUESTS = 4
+
+class RateLimiter:
+    """Sliding-window rate limiter with a separate budget per endpoint key."""
+    
+    def __init__(self, calls: int, period: float = 3600.0):
+        """Allow at most `calls` calls per `period` seconds for each key."""
+        self.calls = calls
+        self.period = period
+        self._windows = defaultdict(deque)
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def _reserve(self, key: str) -> float:
+        """Record a call if one is allowed now; otherwise return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._blocked_until.get(key, 0.0) - now
+            if wait > 0:
+                return wait
+            
+            window = self._windows[key]
+            while window and now - window[0] >= self.period:
+                window.popleft()
+            if len(window) < self.calls:
+                window.append(now)
+                return 0.0
+            return self.period - (now - window[0])
+    
+    def acquire(self, key: str):
+        """Block until a call to the given endpoint is allowed, then record it."""
+        while True:
+            wait = self._reserve(key)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self, key: str):
+        """Async variant of acquire that waits without blocking the event loop."""
+        while True:
+            wait = self._reserve(key)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+    
+    def block(self, key: str, seconds: float):
+        """Hold all calls to an endpoint for the given number of seconds."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._blocked_until[key] = max(self._blocked_until.get(key, 0.0), until)
+
+_shared_client: Optional[httpx.Client] = None
+_shared_client_lock = threading.Lock()
+
+def get_shared_client() -> httpx.Client:
+    """Return the process-wide Graph API HTTP client, creating it on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client.is_closed:
+            # One pooled HTTP/2 client multiplexes concurrent Graph API calls
+            # over a single TLS connection and keeps it warm for every
+            # InstagramClient in the process. With an explicit transport the
+            # pool settings go on the transport; the client ignores its own
+            _shared_client = httpx.Client(
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                transport=httpx.HTTPTransport(
+                    http2=True,
+                    retries=3,
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10)
+                )
+            )
+        return _shared_client
+
+def close_shared_client():
+    """Close the process-wide HTTP client; the next call creates a new one."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is not None:
+            _shared_client.close()
+            _shared_client = None
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+def get_shared_limiter() -> RateLimiter:
+    """Return the process-wide Graph API rate limiter, creating it on first use."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            # Graph counts calls per app and token, not per client object, so
+            # every InstagramClient in the process draws on one budget
+            _shared_limiter = RateLimiter(Config.INSTAGRAM_CALLS_PER_HOUR)
+        return _shared_limiter
+
 class InstagramClient:
     """Client for posting content to Instagram using MCP Instagram Module."""
     
@@ -16,6 +128,134 @@ class InstagramClient:
         self.app_id = Config.INSTAGRAM_APP_ID
         self.app_secret = Config.INSTAGRAM_APP_SECRET
         self.base_url = "https://graph.facebook.com/v18.0"
+        
+        # Fixed endpoint URLs, built once
+        self._media_url = f"{self.base_url}/{self.app_id}/media"
+        self._publish_url = f"{self.base_url}/{self.app_id}/media_publish"
+        self._me_url = f"{self.base_url}/me"
+        self._me_media_url = f"{self.base_url}/me/media"
+        
+        # Pace calls per Graph endpoint so bursts don't run into 429 lockouts
+        self.limiter = get_shared_limiter()
+        
+        # Async client state, created on first use inside an event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def client(self) -> httpx.Client:
+        """The shared HTTP client used for sync calls."""
+        return get_shared_client()
+    
+    def _request(self, method: str, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        """Send a rate-limited request; `endpoint` selects the rate limit bucket."""
+        # Idempotent calls are retried on transient statuses and timeouts; a
+        # publish POST is never sent twice
+        attempts = RETRY_ATTEMPTS if method == "get" else 1
+        for attempt in range(attempts):
+            self.limiter.acquire(endpoint)
+            try:
+                response = getattr(self.client, method)(url, **kwargs)
+            except httpx.TimeoutException:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            self._note_rate_limit(endpoint, response)
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+            time.sleep(self._retry_delay(attempt))
+    
+    async def _arequest(self, method: str, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        """Async variant of _request, capped at MAX_CONCURRENT_REQUESTS in flight."""
+        client = self._get_async_client()
+        attempts = RETRY_ATTEMPTS if method == "get" else 1
+        for attempt in range(attempts):
+            await self.limiter.acquire_async(endpoint)
+            try:
+                async with self._semaphore:
+                    response = await client.request(method.upper(), url, **kwargs)
+            except httpx.TimeoutException:
+                if attempt == attempts - 1:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            self._note_rate_limit(endpoint, response)
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+            await asyncio.sleep(self._retry_delay(attempt))
+    
+    def _retry_delay(self, attempt: int) -> float:
+        """Return a full-jitter backoff delay, so parallel retries don't line up."""
+        return random.uniform(0, RETRY_BACKOFF * 2 ** attempt)
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the async client for the running event loop."""
+        # Connections belong to the loop that opened them, and each
+        # asyncio.run() starts a new loop
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=10,
+                    max_keepalive_connections=MAX_CONCURRENT_REQUESTS,
+                    keepalive_expiry=60.0
+                ),
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
+            self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+            self._async_loop = loop
+        return self._async_client
+    
+    def _note_rate_limit(self, endpoint: str, response):
+        """Hold an endpoint for as long as a 429 response asks, or when its quota is nearly used."""
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            self.limiter.block(
+                endpoint,
+                int(retry_after) if retry_after.isdigit() else DEFAULT_RETRY_AFTER
+            )
+        
+        hold = self._usage_hold(response.headers.get("X-Business-Use-Case-Usage"))
+        if hold:
+            self.limiter.block(endpoint, hold)
+    
+    def _usage_hold(self, usage_header: Optional[str]) -> float:
+        """Return how long to hold an endpoint based on Graph's usage header (0 if not needed)."""
+        # {"<business id>": [{"call_count": 28, "total_time": 25, "total_cputime": 25,
+        #  "estimated_time_to_regain_access": 0, ...}]}, usage in percent
+        if not usage_header:
+            return 0.0
+        try:
+            usage = json.loads(usage_header)
+        except (TypeError, ValueError):
+            return 0.0
+        
+        # A header that isn't shaped as documented is ignored, so it can't
+        # turn a successful response into a failed call
+        hold = 0.0
+        try:
+            for entries in usage.values():
+                for entry in entries:
+                    if max(entry.get(key, 0) for key in ("call_count", "total_time", "total_cputime")) >= USAGE_HOLD_PERCENT:
+                        regain_minutes = entry.get("estimated_time_to_regain_access", 0)
+                        hold = max(hold, regain_minutes * 60 or DEFAULT_RETRY_AFTER)
+        except (AttributeError, TypeError):
+            return 0.0
+        return hold
+    
+    def close(self):
+        """Close the shared HTTP client (a new one is created on next use)."""
+        close_shared_client()
+    
+    async def aclose(self):
+        """Close the async HTTP client, if one was opened."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
     
     def post_to_feed(self, image_path: str, caption: str, hashtags: List[str] = None) -> Dict[str, Any]:
         """Post an image with caption to Instagram feed."""
@@ -26,19 +266,26 @@ class InstagramClient:
             # Step 2: Publish the media
             publish_result = self._publish_media(media_id)
             
-            return {
-                "success": True,
-                "media_id": media_id,
-                "publish_result": publish_result,
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._post_result(media_id, "publish_result", publish_result)
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def apost_to_feed(self, image_path: str, caption: str, hashtags: List[str] = None) -> Dict[str, Any]:
+        """Async variant of post_to_feed."""
+        try:
+            url, data = self._media_container_request(image_path, caption, hashtags)
+            response = await self._arequest("post", "media", url, data=data)
+            media_id = self._check(response, "Failed to create media container").get("id")
+            
+            url, data = self._publish_request(media_id)
+            response = await self._arequest("post", "media_publish", url, data=data)
+            publish_result = self._check(response, "Failed to publish media")
             
+            return self._post_result(media_id, "publish_result", publish_result)
+        
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._error_result(e)
     
     def post_to_stories(self, image_path: str, caption: str = None) -> Dict[str, Any]:
         """Post an image to Instagram stories."""
@@ -49,22 +296,53 @@ class InstagramClient:
             # Create story
             story_result = self._create_story(media_id, caption)
             
-            return {
-                "success": True,
-                "media_id": media_id,
-                "story_result": story_result,
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._post_result(media_id, "story_result", story_result)
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def apost_to_stories(self, image_path: str, caption: str = None) -> Dict[str, Any]:
+        """Async variant of post_to_stories."""
+        try:
+            url, data = self._story_media_request(image_path)
+            response = await self._arequest("post", "media", url, data=data)
+            media_id = self._check(response, "Failed to upload story media").get("id")
+            
+            url, data = self._publish_request(media_id, caption)
+            response = await self._arequest("post", "media_publish", url, data=data)
+            story_result = self._check(response, "Failed to create story")
             
+            return self._post_result(media_id, "story_result", story_result)
+        
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._error_result(e)
     
-    def _create_media_container(self, image_path: str, caption: str, hashtags: List[str] = None) -> str:
-        """Create a media container for Instagram feed post."""
+    def _post_result(self, media_id: str, result_key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the result returned for a successful post."""
+        return {
+            "success": True,
+            "media_id": media_id,
+            result_key: result,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Build the result returned for a failed post."""
+        return {
+            "success": False,
+            "error": str(error),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _check(self, response, error_message: str) -> Dict[str, Any]:
+        """Return the JSON body of a successful response, or raise with the API error."""
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"{error_message}: {response.text}")
+    
+    def _media_container_request(self, image_path: str, caption: str, hashtags: List[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Build the URL and form data for a feed media container."""
         # Upload image to Instagram
         image_url = self._upload_image(image_path)
         
@@ -73,61 +351,30 @@ class InstagramClient:
         if hashtags:
             full_caption += "\n\n" + " ".join(hashtags)
         
-        # Create media container
-        url = f"{self.base_url}/{Config.INSTAGRAM_APP_ID}/media"
+        url = self._media_url
         data = {
             "image_url": image_url,
             "caption": full_caption,
             "access_token": self.access_token
         }
-        
-        response = requests.post(url, data=data)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("id")
-        else:
-            raise Exception(f"Failed to create media container: {response.text}")
-    
-    def _publish_media(self, media_id: str) -> Dict[str, Any]:
-        """Publish the media container to Instagram feed."""
-        url = f"{self.base_url}/{Config.INSTAGRAM_APP_ID}/media_publish"
-        data = {
-            "creation_id": media_id,
-            "access_token": self.access_token
-        }
-        
-        response = requests.post(url, data=data)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"Failed to publish media: {response.text}")
+        return url, data
     
-    def _upload_story_media(self, image_path: str) -> str:
-        """Upload image for Instagram stories."""
+    def _story_media_request(self, image_path: str) -> Tuple[str, Dict[str, Any]]:
+        """Build the URL and form data for a story media container."""
         # For stories, we need to upload the image first
         image_url = self._upload_image(image_path)
         
-        # Create story media container
-        url = f"{self.base_url}/{Config.INSTAGRAM_APP_ID}/media"
+        url = self._media_url
         data = {
             "image_url": image_url,
             "media_type": "STORIES",
             "access_token": self.access_token
         }
-        
-        response = requests.post(url, data=data)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("id")
-        else:
-            raise Exception(f"Failed to upload story media: {response.text}")
+        return url, data
     
-    def _create_story(self, media_id: str, caption: str = None) -> Dict[str, Any]:
-        """Create an Instagram story."""
-        url = f"{self.base_url}/{Config.INSTAGRAM_APP_ID}/media_publish"
+    def _publish_request(self, media_id: str, caption: str = None) -> Tuple[str, Dict[str, Any]]:
+        """Build the URL and form data for publishing a media container."""
+        url = self._publish_url
         data = {
             "creation_id": media_id,
             "access_token": self.access_token
@@ -136,12 +383,31 @@ class InstagramClient:
         if caption:
             data["caption"] = caption
         
-        response = requests.post(url, data=data)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"Failed to create story: {response.text}")
+        return url, data
+    
+    def _create_media_container(self, image_path: str, caption: str, hashtags: List[str] = None) -> str:
+        """Create a media container for Instagram feed post."""
+        url, data = self._media_container_request(image_path, caption, hashtags)
+        response = self._request("post", "media", url, data=data)
+        return self._check(response, "Failed to create media container").get("id")
+    
+    def _publish_media(self, media_id: str) -> Dict[str, Any]:
+        """Publish the media container to Instagram feed."""
+        url, data = self._publish_request(media_id)
+        response = self._request("post", "media_publish", url, data=data)
+        return self._check(response, "Failed to publish media")
+    
+    def _upload_story_media(self, image_path: str) -> str:
+        """Upload image for Instagram stories."""
+        url, data = self._story_media_request(image_path)
+        response = self._request("post", "media", url, data=data)
+        return self._check(response, "Failed to upload story media").get("id")
+    
+    def _create_story(self, media_id: str, caption: str = None) -> Dict[str, Any]:
+        """Create an Instagram story."""
+        url, data = self._publish_request(media_id, caption)
+        response = self._request("post", "media_publish", url, data=data)
+        return self._check(response, "Failed to create story")
     
     def _upload_image(self, image_path: str) -> str:
         """Upload image to a temporary location and return URL."""
@@ -149,42 +415,80 @@ class InstagramClient:
         # For now, we'll simulate this by returning a placeholder URL
         return f"https://example.com/images/{os.path.basename(image_path)}"
     
+    def _account_info_request(self) -> Tuple[str, Dict[str, Any]]:
+        """Build the URL and query parameters for the account info lookup."""
+        url = self._me_url
+        params = {
+            "fields": "id,username,account_type,media_count",
+            "access_token": self.access_token
+        }
+        return url, params
+    
+    def _recent_posts_request(self, limit: int) -> Tuple[str, Dict[str, Any]]:
+        """Build the URL and query parameters for the recent posts lookup."""
+        url = self._me_media_url
+        params = {
+            "fields": "id,caption,media_type,media_url,thumbnail_url,timestamp",
+            "limit": limit,
+            "access_token": self.access_token
+        }
+        return url, params
+    
     def get_account_info(self) -> Dict[str, Any]:
         """Get Instagram account information."""
         try:
-            url = f"{self.base_url}/me"
-            params = {
-                "fields": "id,username,account_type,media_count",
-                "access_token": self.access_token
-            }
-            
-            response = requests.get(url, params=params)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"Failed to get account info: {response.text}")
-                
+            url, params = self._account_info_request()
+            response = self._request("get", "me", url, params=params)
+            return self._check(response, "Failed to get account info")
+        
         except Exception as e:
             raise Exception(f"Failed to get account info: {str(e)}")
     
-    def get_recent_posts(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent posts from the account."""
+    async def aget_account_info(self) -> Dict[str, Any]:
+        """Async variant of get_account_info."""
         try:
-            url = f"{self.base_url}/me/media"
-            params = {
-                "fields": "id,caption,media_type,media_url,thumbnail_url,timestamp",
-                "limit": limit,
-                "access_token": self.access_token
-            }
+            url, params = self._account_info_request()
+            response = await self._arequest("get", "me", url, params=params)
+            return self._check(response, "Failed to get account info")
+        
+        except Exception as e:
+            raise Exception(f"Failed to get account info: {str(e)}")
+    
+    def iter_recent_posts(self, limit: int = 10) -> Iterator[Dict[str, Any]]:
+        """Yield up to `limit` recent posts, fetching further pages only as needed."""
+        url, params = self._recent_posts_request(limit)
+        remaining = limit
+        while url and remaining > 0:
+            response = self._request("get", "me/media", url, params=params)
+            page = self._check(response, "Failed to get recent posts")
             
-            response = requests.get(url, params=params)
+            for post in page.get("data", [])[:remaining]:
+                yield post
+                remaining -= 1
             
-            if response.status_code == 200:
-                return response.json().get("data", [])
-            else:
-                raise Exception(f"Failed to get recent posts: {response.text}")
-                
+            # The next page URL already carries the query parameters
+            url, params = page.get("paging", {}).get("next"), None
+    
+    def get_recent_posts(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent posts from the account."""
+        try:
+            return list(self.iter_recent_posts(limit))
+        
+        except Exception as e:
+            raise Exception(f"Failed to get recent posts: {str(e)}")
+    
+    async def aget_recent_posts(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Async variant of get_recent_posts."""
+        try:
+            url, params = self._recent_posts_request(limit)
+            posts = []
+            while url and len(posts) < limit:
+                response = await self._arequest("get", "me/media", url, params=params)
+                page = self._check(response, "Failed to get recent posts")
+                posts.extend(page.get("data", [])[:limit - len(posts)])
+                url, params = page.get("paging", {}).get("next"), None
+            return posts
+        
         except Exception as e:
             raise Exception(f"Failed to get recent posts: {str(e)}")
     
@@ -192,14 +496,14 @@ class InstagramClient:
         """Delete a post from Instagram."""
         try:
             url = f"{self.base_url}/{media_id}"
-            data = {
+            params = {
                 "access_token": self.access_token
             }
             
-            response = requests.delete(url, data=data)
+            response = self._request("delete", "media_object", url, params=params)
             
             return response.status_code == 200
-            
+        
         except Exception as e:
             print(f"Failed to delete post: {str(e)}")
-            return False
\ No newline at end of file
+            return False
@@ -1,168 +1,600 @@
-"""JSON-based storage system for tracking content history and preventing duplicates."""
+"""SQLite-based storage system for tracking content history and preventing duplicates."""
 
-import json
+import math
 import os
+from contextlib import contextmanager
+from functools import lru_cache
+import orjson
+import sqlite3
+import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 from pathlib import Path
 
+DB_FILENAME = "history.db"
+
+# Storage path that selects an in-memory database instead of DB_FILENAME
+MEMORY_PATH = ":memory:"
+
+# Stored in PRAGMA user_version; bump when SCHEMA or its migrations change
+SCHEMA_VERSION = 1
+
+# Columns per table, in the order entries are returned
+COLUMNS = {
+    "prompts": ("id", "prompt", "timestamp", "metadata"),
+    "captions": ("id", "prompt_id", "caption", "timestamp", "metadata"),
+    "images": ("id", "prompt_id", "image_path", "timestamp", "metadata"),
+    "posts": ("id", "timestamp", "post_data")
+}
+
+# Columns holding JSON-encoded values
+JSON_COLUMNS = frozenset({"metadata", "post_data"})
+
+# Timestamps are stored as integer nanoseconds (time.time_ns()) and returned
+# as ISO strings
+TIMESTAMP_COLUMN = "timestamp"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    tokens TEXT
+);
+CREATE TABLE IF NOT EXISTS captions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_id INTEGER,
+    caption TEXT,
+    timestamp INTEGER NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_id INTEGER,
+    image_path TEXT,
+    timestamp INTEGER NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp INTEGER NOT NULL,
+    post_data TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS prompts_timestamp ON prompts (timestamp);
+CREATE INDEX IF NOT EXISTS captions_timestamp ON captions (timestamp);
+CREATE INDEX IF NOT EXISTS images_timestamp ON images (timestamp);
+CREATE INDEX IF NOT EXISTS posts_timestamp ON posts (timestamp);
+"""
+
+# Prompts more similar than this (Jaccard over word sets) are duplicates
+SIMILARITY_THRESHOLD = 0.9
+
+def iso_to_ns(value: str) -> int:
+    """Convert an ISO timestamp (local time, as datetime.isoformat() writes it) to nanoseconds."""
+    return round(datetime.fromisoformat(value).timestamp() * 1_000_000) * 1000
+
+def ns_to_iso(ns: int) -> str:
+    """Convert nanoseconds since the epoch to a local ISO timestamp."""
+    # Split off the microseconds so the conversion doesn't go through a float
+    return datetime.fromtimestamp(ns // 10**9).replace(microsecond=ns // 1000 % 10**6).isoformat()
+
+@lru_cache(maxsize=None)
+def insert_sql(kind: str, columns: Tuple[str, ...]) -> str:
+    """Return the INSERT statement for a table and column list.
+    
+    Cached only so the SQL isn't formatted again on every insert; sqlite3's
+    own statement cache matches on the SQL text either way.
+    """
+    return f"INSERT INTO {kind} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+@lru_cache(maxsize=4096)
+def tokenize(text: str) -> frozenset:
+    """Return the lowercased word set used for prompt similarity (cached; the result is immutable)."""
+    return frozenset(text.lower().split())
+
+def jaccard(words1: frozenset, words2: frozenset) -> float:
+    """Jaccard similarity of two word sets (0.0 when both are empty)."""
+    # Derive the union size from the intersection rather than building it
+    intersection = len(words1 & words2)
+    union = len(words1) + len(words2) - intersection
+    return intersection / union if union > 0 else 0.0
+
+class PromptIndex:
+    """In-memory near-duplicate index over prompt word sets.
+    
+    Uses prefix filtering: if two sets have Jaccard similarity >= t, they
+    share a word among the first |x| - ceil(t*|x|) + 1 words of each set
+    under a common word order. Each prompt is indexed under only that
+    prefix, so a lookup verifies a handful of candidates instead of every
+    stored prompt, and still finds exactly what a full scan would.
+    
+    Two different sets need an overlap of at least min_overlap words to get
+    over the threshold (10 at 0.9), so shorter prompts can only match an
+    identical word set and skip the candidate search entirely.
+    """
+    
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        """Create an empty index."""
+        self.threshold = threshold
+        self.min_overlap = 1
+        while not self.min_overlap / (self.min_overlap + 1) > threshold:
+            self.min_overlap += 1
+        self.last_id = 0
+        self._words: Dict[int, frozenset] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._exact: Dict[frozenset, int] = {}
+    
+    def _prefix(self, words: frozenset) -> List[str]:
+        """Return the words a set is indexed and probed under."""
+        # floor() can only make the prefix longer than the exact bound, and a
+        # longer prefix never loses candidates
+        length = len(words) - math.floor(self.threshold * len(words)) + 1
+        return sorted(words, key=lambda word: (hash(word), word))[:length]
+    
+    def add(self, prompt_id: int, words: frozenset):
+        """Index a stored prompt's word set."""
+        self.last_id = max(self.last_id, prompt_id)
+        
+        # An empty set has similarity 0.0 with everything, so it never matches
+        if not words:
+            return
+        
+        self._exact[words] = prompt_id
+        if len(words) < self.min_overlap:
+            return
+        
+        self._words[prompt_id] = words
+        for word in self._prefix(words):
+            self._postings[word].add(prompt_id)
+    
+    def find(self, words: frozenset) -> Optional[int]:
+        """Return the id of the newest indexed prompt with exactly this word set."""
+        return self._exact.get(words)
+    
+    def is_duplicate(self, words: frozenset) -> bool:
+        """Check whether any indexed prompt is more similar than the threshold."""
+        if not words:
+            return False
+        
+        # Identical word sets are the common case and need no scoring
+        if words in self._exact:
+            return True
+        if len(words) < self.min_overlap:
+            return False
+        
+        candidates = set()
+        for word in self._prefix(words):
+            candidates.update(self._postings.get(word, ()))
+        
+        size = len(words)
+        for prompt_id in candidates:
+            other = self._words[prompt_id]
+            
+            # Similarity can't exceed the ratio of the set sizes
+            if min(size, len(other)) / max(size, len(other)) <= self.threshold:
+                continue
+            if jaccard(words, other) > self.threshold:
+                return True
+        return False
+
 class ContentStorage:
-    """Manages JSON-based storage for content history and duplicate prevention."""
+    """Manages SQLite-based storage for content history and duplicate prevention."""
     
     def __init__(self, storage_path: str = "./data"):
         """Initialize the storage system."""
+        # ":memory:" keeps the history in a private in-memory database that
+        # lasts as long as this instance (useful for tests)
+        self.in_memory = storage_path == MEMORY_PATH
         self.storage_path = Path(storage_path)
-        self.storage_path.mkdir(exist_ok=True)
+        if not self.in_memory:
+            self.storage_path.mkdir(exist_ok=True)
         
-        # Storage files
+        self.db_file = MEMORY_PATH if self.in_memory else self.storage_path / DB_FILENAME
+        
+        # Legacy JSON history files, imported once into the database
         self.prompts_file = self.storage_path / "prompts_history.json"
         self.captions_file = self.storage_path / "captions_history.json"
         self.images_file = self.storage_path / "images_history.json"
         self.posts_file = self.storage_path / "posts_history.json"
         
-        # Initialize storage files if they don't exist
+        # WAL lets readers (e.g. the health check) run alongside the agent's
+        # writes, and appends no longer rewrite the whole history
+        self.db = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        
+        # Built from the prompts table on first use
+        self._prompt_index = None
+        
+        # Set while a batch() block holds the transaction open
+        self._in_batch = False
+        
+        # Initialize the schema and import any legacy JSON history
         self._initialize_storage()
     
     def _initialize_storage(self):
-        """Initialize storage files with empty structures if they don't exist."""
-        files = [
-            self.prompts_file,
-            self.captions_file,
-            self.images_file,
-            self.posts_file
-        ]
-        
-        for file_path in files:
-            if not file_path.exists():
-                with open(file_path, 'w') as f:
-                    json.dump([], f, indent=2)
+        """Create the tables if needed and migrate legacy JSON history files."""
+        # An up-to-date database skips the schema checks entirely
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._upgrade_schema()
+        
+        # An in-memory database has no legacy files to import
+        if self.in_memory:
+            return
+        
+        legacy_files = {
+            "prompts": self.prompts_file,
+            "captions": self.captions_file,
+            "images": self.images_file,
+            "posts": self.posts_file
+        }
+        
+        # One directory listing instead of a stat per legacy file
+        existing_files = {entry.name for entry in os.scandir(self.storage_path)}
+        prompt_ids = {}
+        for kind, file_path in legacy_files.items():
+            if file_path.name in existing_files:
+                self._migrate_json(kind, file_path, prompt_ids)
+    
+    def _upgrade_schema(self):
+        """Bring a new or older database up to the current schema."""
+        with self.db:
+            self.db.executescript(SCHEMA)
+            
+            # Databases created before prompt tokens were stored
+            prompt_columns = {row[1] for row in self.db.execute("PRAGMA table_info(prompts)")}
+            if "tokens" not in prompt_columns:
+                self.db.execute("ALTER TABLE prompts ADD COLUMN tokens TEXT")
+        
+        # Databases created before timestamps were stored as integers, or
+        # before ids were AUTOINCREMENT
+        prompt_types = {row[1]: row[2] for row in self.db.execute("PRAGMA table_info(prompts)")}
+        prompts_sql = self.db.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'prompts'"
+        ).fetchone()[0]
+        if prompt_types[TIMESTAMP_COLUMN] != "INTEGER" or "AUTOINCREMENT" not in prompts_sql:
+            self._rebuild_tables()
+        
+        with self.db:
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def _rebuild_tables(self):
+        """Recreate the tables from SCHEMA, keeping their rows and converting ISO timestamps."""
+        # Column types and AUTOINCREMENT can't be altered in place, so copy
+        # each table over
+        self.db.create_function(
+            "iso_to_ns", 1,
+            lambda value: iso_to_ns(value) if isinstance(value, str) else value,
+            deterministic=True
+        )
+        with self.db:
+            self.db.execute("BEGIN")
+            for kind in COLUMNS:
+                self.db.execute(f"DROP INDEX IF EXISTS {kind}_timestamp")
+                self.db.execute(f"ALTER TABLE {kind} RENAME TO {kind}_old")
+            for statement in SCHEMA.split(";"):
+                self.db.execute(statement)
+            for kind, columns in COLUMNS.items():
+                columns = columns + ("tokens",) if kind == "prompts" else columns
+                values = [f"iso_to_ns({column})" if column == TIMESTAMP_COLUMN else column for column in columns]
+                self.db.execute(
+                    f"INSERT INTO {kind} ({', '.join(columns)}) "
+                    f"SELECT {', '.join(values)} FROM {kind}_old"
+                )
+                self.db.execute(f"DROP TABLE {kind}_old")
+    
+    def _migrate_json(self, kind: str, file_path: Path, prompt_ids: Dict[int, int]):
+        """Import a legacy JSON history file, then rename it so it is only imported once.
+        
+        Legacy ids were len(history) + 1 and repeat after a cleanup, so every
+        row gets a new id from SQLite. prompt_ids maps legacy prompt ids to the
+        new ones, for the captions and images imported after the prompts; a
+        repeated legacy id maps to the last prompt that had it.
+        """
+        columns = tuple(column for column in COLUMNS[kind] if column != "id")
+        sql = insert_sql(kind, columns)
+        
+        with self.db:
+            for entry in self._load_json(file_path):
+                values = dict(entry)
+                if "prompt_id" in columns:
+                    values["prompt_id"] = prompt_ids.get(values.get("prompt_id"), values.get("prompt_id"))
+                cursor = self.db.execute(sql, [self._encode(column, values.get(column)) for column in columns])
+                if kind == "prompts":
+                    prompt_ids[entry.get("id")] = cursor.lastrowid
+        
+        file_path.rename(file_path.with_suffix(".json.migrated"))
+    
+    @contextmanager
+    def _transaction(self):
+        """Commit on exit, unless inside batch(), which commits once at its end."""
+        if self._in_batch:
+            yield
+        else:
+            with self.db:
+                yield
+    
+    @contextmanager
+    def batch(self):
+        """Group add_* calls into one transaction, committed when the block exits.
+        
+        Usage: with storage.batch(): storage.add_prompt(...); storage.add_post(...)
+        If the block raises, none of its writes are kept.
+        """
+        if self._in_batch:
+            yield self
+            return
+        
+        self._in_batch = True
+        try:
+            with self.db:
+                yield self
+        except Exception:
+            # Prompts added in the rolled-back block are still in the index
+            self._prompt_index = None
+            raise
+        finally:
+            self._in_batch = False
     
     def _load_json(self, file_path: Path) -> List[Dict]:
         """Load JSON data from file."""
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
             return []
     
-    def _save_json(self, file_path: Path, data: List[Dict]):
-        """Save JSON data to file."""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+    def _encode(self, column: str, value: Any) -> Any:
+        """Encode a value for storage in the given column."""
+        if column in JSON_COLUMNS:
+            return orjson.dumps(value or {}, option=orjson.OPT_NON_STR_KEYS).decode()
+        if column == TIMESTAMP_COLUMN and isinstance(value, str):
+            return iso_to_ns(value)
+        return value
+    
+    def _insert(self, kind: str, entry: Dict[str, Any]) -> int:
+        """Insert an entry (without id) into a table and return its new id."""
+        columns = tuple(entry)
+        cursor = self.db.execute(
+            insert_sql(kind, columns),
+            [self._encode(column, entry[column]) for column in columns]
+        )
+        return cursor.lastrowid
+    
+    def _insert_many(self, kind: str, entries: List[Dict[str, Any]]) -> int:
+        """Insert entries that share the same columns with one executemany; returns the row count."""
+        if not entries:
+            return 0
+        columns = tuple(entries[0])
+        self.db.executemany(
+            insert_sql(kind, columns),
+            ([self._encode(column, entry[column]) for column in columns] for entry in entries)
+        )
+        return len(entries)
+    
+    def _to_entry(self, kind: str, row: tuple) -> Dict[str, Any]:
+        """Convert a table row into the entry dict returned to callers."""
+        entry = {
+            column: orjson.loads(value) if column in JSON_COLUMNS else value
+            for column, value in zip(COLUMNS[kind], row)
+        }
+        entry[TIMESTAMP_COLUMN] = ns_to_iso(entry[TIMESTAMP_COLUMN])
+        return entry
+    
+    def counts(self) -> Dict[str, int]:
+        """Return the entry count of every table in a single query."""
+        query = "SELECT " + ", ".join(f"(SELECT count(*) FROM {kind})" for kind in COLUMNS)
+        return dict(zip(COLUMNS, self.db.execute(query).fetchone()))
     
     def add_prompt(self, prompt: str, metadata: Dict[str, Any] = None) -> bool:
         """Add a new prompt to history and check for duplicates."""
-        prompts = self._load_json(self.prompts_file)
+        words = tokenize(prompt)
         
         # Check for duplicates
-        if self._is_duplicate_prompt(prompt, prompts):
+        if self._sync_prompt_index().is_duplicate(words):
             return False
         
-        # Add new prompt
-        prompt_entry = {
-            "id": len(prompts) + 1,
-            "prompt": prompt,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
-        
-        prompts.append(prompt_entry)
-        self._save_json(self.prompts_file, prompts)
+        # Add new prompt, storing its word set so the index loads it as-is
+        with self._transaction():
+            prompt_id = self._insert("prompts", {
+                "prompt": prompt,
+                "timestamp": time.time_ns(),
+                "metadata": metadata,
+                "tokens": " ".join(sorted(words))
+            })
+        self._prompt_index.add(prompt_id, words)
         return True
     
+    def add_prompts_bulk(self, prompts: List[Tuple[str, Dict[str, Any]]]) -> List[bool]:
+        """Add (prompt, metadata) pairs in one transaction; returns add_prompt's result for each."""
+        index = self._sync_prompt_index()
+        
+        # Each prompt is still checked against those accepted before it in the
+        # list, via a scratch index, so the accepted rows can go in one executemany
+        pending = PromptIndex(index.threshold)
+        timestamp = time.time_ns()
+        entries = []
+        results = []
+        for prompt, metadata in prompts:
+            words = tokenize(prompt)
+            if index.is_duplicate(words) or pending.is_duplicate(words):
+                results.append(False)
+                continue
+            pending.add(len(entries) + 1, words)
+            entries.append({
+                "prompt": prompt,
+                "timestamp": timestamp,
+                "metadata": metadata,
+                "tokens": " ".join(sorted(words))
+            })
+            results.append(True)
+        
+        with self._transaction():
+            self._insert_many("prompts", entries)
+        
+        # The new rows carry their tokens, so syncing indexes them without re-tokenizing
+        self._sync_prompt_index()
+        return results
+    
+    def add_captions_bulk(self, captions: List[Tuple[str, int, Dict[str, Any]]]) -> int:
+        """Add (caption, prompt_id, metadata) tuples in one transaction; returns the number added."""
+        timestamp = time.time_ns()
+        with self._transaction():
+            return self._insert_many("captions", [
+                {"prompt_id": prompt_id, "caption": caption, "timestamp": timestamp, "metadata": metadata}
+                for caption, prompt_id, metadata in captions
+            ])
+    
+    def add_images_bulk(self, images: List[Tuple[str, int, Dict[str, Any]]]) -> int:
+        """Add (image_path, prompt_id, metadata) tuples in one transaction; returns the number added."""
+        timestamp = time.time_ns()
+        with self._transaction():
+            return self._insert_many("images", [
+                {"prompt_id": prompt_id, "image_path": image_path, "timestamp": timestamp, "metadata": metadata}
+                for image_path, prompt_id, metadata in images
+            ])
+    
     def add_caption(self, caption: str, prompt_id: int, metadata: Dict[str, Any] = None) -> int:
         """Add a new caption to history."""
-        captions = self._load_json(self.captions_file)
-        
-        caption_entry = {
-            "id": len(captions) + 1,
-            "prompt_id": prompt_id,
-            "caption": caption,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
-        
-        captions.append(caption_entry)
-        self._save_json(self.captions_file, captions)
-        return caption_entry["id"]
+        with self._transaction():
+            return self._insert("captions", {
+                "prompt_id": prompt_id,
+                "caption": caption,
+                "timestamp": time.time_ns(),
+                "metadata": metadata
+            })
     
     def add_image(self, image_path: str, prompt_id: int, metadata: Dict[str, Any] = None) -> int:
         """Add a new image to history."""
-        images = self._load_json(self.images_file)
-        
-        image_entry = {
-            "id": len(images) + 1,
-            "prompt_id": prompt_id,
-            "image_path": image_path,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
+        with self._transaction():
+            return self._insert("images", {
+                "prompt_id": prompt_id,
+                "image_path": image_path,
+                "timestamp": time.time_ns(),
+                "metadata": metadata
+            })
+    
+    def add_content_bundle(self, caption: str, image_path: str, prompt_id: int,
+                           caption_metadata: Dict[str, Any] = None,
+                           image_metadata: Dict[str, Any] = None) -> Tuple[int, int]:
+        """Record a generated caption and image for a prompt; returns (caption_id, image_id)."""
+        timestamp = time.time_ns()
         
-        images.append(image_entry)
-        self._save_json(self.images_file, images)
-        return image_entry["id"]
+        # One transaction, so a post never ends up with only half its content
+        with self._transaction():
+            caption_id = self._insert("captions", {
+                "prompt_id": prompt_id,
+                "caption": caption,
+                "timestamp": timestamp,
+                "metadata": caption_metadata
+            })
+            image_id = self._insert("images", {
+                "prompt_id": prompt_id,
+                "image_path": image_path,
+                "timestamp": timestamp,
+                "metadata": image_metadata
+            })
+        return caption_id, image_id
+    
+    def latest_prompt_id(self) -> int:
+        """Return the id of the most recently added prompt (0 if there are none)."""
+        return self.db.execute("SELECT coalesce(max(id), 0) FROM prompts").fetchone()[0]
     
     def add_post(self, post_data: Dict[str, Any]) -> int:
         """Add a new post to history."""
-        posts = self._load_json(self.posts_file)
-        
-        post_entry = {
-            "id": len(posts) + 1,
-            "timestamp": datetime.now().isoformat(),
-            "post_data": post_data
-        }
+        with self._transaction():
+            return self._insert("posts", {
+                "timestamp": time.time_ns(),
+                "post_data": post_data
+            })
+    
+    def add_posts_bulk(self, posts: List[Dict[str, Any]]) -> int:
+        """Add several posts in one transaction; returns the number added."""
+        timestamp = time.time_ns()
+        with self._transaction():
+            return self._insert_many("posts", [
+                {"timestamp": timestamp, "post_data": post_data} for post_data in posts
+            ])
+    
+    def _sync_prompt_index(self) -> PromptIndex:
+        """Return the prompt index, first indexing prompts added since the last sync."""
+        if self._prompt_index is None:
+            self._prompt_index = PromptIndex()
         
-        posts.append(post_entry)
-        self._save_json(self.posts_file, posts)
-        return post_entry["id"]
+        # Picks up rows written by other processes as well as the initial load.
+        # Stored tokens skip re-tokenizing; rows imported from JSON have none.
+        rows = self.db.execute(
+            "SELECT id, prompt, tokens FROM prompts WHERE id > ? ORDER BY id",
+            (self._prompt_index.last_id,)
+        )
+        for prompt_id, prompt, tokens in rows:
+            words = frozenset(tokens.split()) if tokens is not None else tokenize(prompt)
+            self._prompt_index.add(prompt_id, words)
+        return self._prompt_index
     
-    def _is_duplicate_prompt(self, prompt: str, prompts: List[Dict]) -> bool:
+    def _is_duplicate_prompt(self, prompt: str) -> bool:
         """Check if a prompt is a duplicate based on similarity."""
-        # Simple similarity check - can be enhanced with more sophisticated algorithms
-        for existing_prompt in prompts:
-            similarity = self._calculate_similarity(prompt, existing_prompt["prompt"])
-            # Only consider it a duplicate if similarity is very high (0.9+) to avoid false positives
-            if similarity > 0.9:
-                return True
-        return False
+        # Only consider it a duplicate if similarity is very high (0.9+) to avoid false positives
+        return self._sync_prompt_index().is_duplicate(tokenize(prompt))
     
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two texts (simple implementation)."""
-        # Convert to lowercase and split into words
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
-        # Calculate Jaccard similarity
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-        
-        return intersection / union if union > 0 else 0.0
+        # Jaccard similarity of the lowercased word sets
+        return jaccard(tokenize(text1), tokenize(text2))
+    
+    def _get_recent(self, kind: str, limit: int) -> List[Dict]:
+        """Return the newest entries of a table, newest first."""
+        rows = self.db.execute(
+            f"SELECT {', '.join(COLUMNS[kind])} FROM {kind} ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [self._to_entry(kind, row) for row in rows]
+    
+    def find_prompt(self, prompt: str) -> Optional[Dict]:
+        """Return the newest stored prompt with the same normalized words, or None."""
+        prompt_id = self._sync_prompt_index().find(tokenize(prompt))
+        if prompt_id is None:
+            return None
+        row = self.db.execute(
+            f"SELECT {', '.join(COLUMNS['prompts'])} FROM prompts WHERE id = ?",
+            (prompt_id,)
+        ).fetchone()
+        return self._to_entry("prompts", row)
     
     def get_recent_prompts(self, limit: int = 10) -> List[Dict]:
         """Get recent prompts."""
-        prompts = self._load_json(self.prompts_file)
-        return sorted(prompts, key=lambda x: x["timestamp"], reverse=True)[:limit]
+        return self._get_recent("prompts", limit)
     
     def get_recent_captions(self, limit: int = 10) -> List[Dict]:
         """Get recent captions."""
-        captions = self._load_json(self.captions_file)
-        return sorted(captions, key=lambda x: x["timestamp"], reverse=True)[:limit]
+        return self._get_recent("captions", limit)
     
     def get_recent_posts(self, limit: int = 10) -> List[Dict]:
         """Get recent posts."""
-        posts = self._load_json(self.posts_file)
-        return sorted(posts, key=lambda x: x["timestamp"], reverse=True)[:limit]
+        return self._get_recent("posts", limit)
     
     def cleanup_old_data(self, days: int = 30):
         """Clean up data older than specified days."""
-        cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
+        # Integer timestamps compare directly against the indexed column
+        cutoff = time.time_ns() - days * 86400 * 10**9
         
-        files = [self.prompts_file, self.captions_file, self.images_file, self.posts_file]
+        with self._transaction():
+            for kind in COLUMNS:
+                self.db.execute(f"DELETE FROM {kind} WHERE timestamp <= ?", (cutoff,))
         
-        for file_path in files:
-            data = self._load_json(file_path)
-            filtered_data = [
-                item for item in data 
-                if datetime.fromisoformat(item["timestamp"]).timestamp() > cutoff_date
-            ]
-            self._save_json(file_path, filtered_data)
\ No newline at end of file
+        # Rebuilt without the deleted prompts on next use
+        self._prompt_index = None
+    
+    def reset(self):
+        """Delete all stored history and restart ids from 1."""
+        with self._transaction():
+            for kind in COLUMNS:
+                self.db.execute(f"DELETE FROM {kind}")
+            self.db.execute("DELETE FROM sqlite_sequence")
+        self._prompt_index = None
+    
+    def close(self):
+        """Close the database connection."""
+        self.db.close()
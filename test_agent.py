@@ -2,7 +2,9 @@
 
 import sys
 import os
-import json
+import orjson
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # Add the current directory to Python path
@@ -28,7 +30,9 @@ def test_storage():
     """Test storage system."""
     print("💾 Testing storage system...")
     try:
-        storage = ContentStorage("./test_data")
+        # A private directory keeps this test independent of the others
+        data_dir = tempfile.TemporaryDirectory(prefix="test_data_")
+        storage = ContentStorage(data_dir.name)
         
         # Test adding a prompt
         prompt_id = storage.add_prompt("Test prompt for coffee beans", {"test": True})
@@ -54,6 +58,8 @@ def test_storage():
             print("⚠️  Duplicate prevention not working")
         
         print("✅ Storage system working correctly")
+        storage.close()
+        data_dir.cleanup()
         return True
         
     except Exception as e:
@@ -123,7 +129,7 @@ def test_full_workflow():
         
         # Test analytics
         analytics = agent.get_analytics()
-        print(f"✅ Analytics: {json.dumps(analytics, indent=2)}")
+        print(f"✅ Analytics: {orjson.dumps(analytics, option=orjson.OPT_INDENT_2).decode()}")
         
         print("✅ Full workflow test completed")
         return True
@@ -148,14 +154,17 @@ def main():
     passed = 0
     total = len(tests)
     
-    for test in tests:
-        try:
-            if test():
-                passed += 1
-            print()
-        except Exception as e:
-            print(f"❌ Test failed with exception: {str(e)}")
-            print()
+    # The tests are independent and mostly wait on network calls, so run
+    # them side by side (their output lines may interleave)
+    with ThreadPoolExecutor(max_workers=total) as executor:
+        futures = {executor.submit(test): test for test in tests}
+        for future in as_completed(futures):
+            try:
+                if future.result():
+                    passed += 1
+            except Exception as e:
+                print(f"❌ {futures[future].__name__} failed with exception: {str(e)}")
+    print()
     
     print("=" * 50)
     print(f"📊 Test Results: {passed}/{total} tests passed")
@@ -0,0 +1,582 @@
+"""Unit tests for the API clients, with the network and the clock faked."""
+
+import sys
+import os
+import json
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+from google.api_core import exceptions as google_exceptions
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_helpers import run_tests
+import gemini_client
+import instagram_client
+import cerebrus_client
+
+class FakeClock:
+    """Stand-in for the time module: sleeping advances monotonic() instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+class TestGeminiClient(unittest.TestCase):
+    """Test the Gemini client's generation calls and response parsing."""
+
+    def setUp(self):
+        """Build a client around a mocked model."""
+        patcher = patch.multiple(gemini_client.genai, configure=Mock(), GenerativeModel=Mock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.model = gemini_client.genai.GenerativeModel.return_value
+
+    def test_generations_are_not_reused(self):
+        """Repeat requests for the same product go to the API every time."""
+        client = gemini_client.GeminiClient()
+        self.model.generate_content.return_value.text = "#coffee #beans"
+        client.generate_hashtags({"description": "Coffee"}, "A caption")
+        client.generate_hashtags({"description": "Coffee"}, "A caption")
+
+        self.model.generate_content.return_value.text = "Fresh caption"
+        client.generate_caption({"description": "Coffee"})
+        client.generate_caption({"description": "Coffee"})
+        self.assertEqual(self.model.generate_content.call_count, 4)
+
+    def test_image_paths_are_per_run(self):
+        """Each generated image gets its own file, named by the prompt digest and the time."""
+        client = gemini_client.GeminiClient()
+        with patch.object(gemini_client.os, "makedirs"):
+            first = client._prepare_image_path("A coffee ad")
+            second = client._prepare_image_path("A coffee ad")
+            other = client._prepare_image_path("A tea ad")
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.rsplit("_", 1)[0], second.rsplit("_", 1)[0])
+        self.assertNotEqual(first.rsplit("_", 1)[0], other.rsplit("_", 1)[0])
+        self.assertTrue(first.startswith("./generated_images/image_") and first.endswith(".jpg"))
+
+    def test_parse_plain_json(self):
+        """A bare JSON reply gives the caption and '#'-prefixed hashtags."""
+        client = gemini_client.GeminiClient()
+        caption, hashtags = client._parse_caption_and_hashtags(
+            '{"caption": "  Fresh coffee  ", "hashtags": ["coffee", "#beans"]}'
+        )
+        self.assertEqual(caption, "Fresh coffee")
+        self.assertEqual(hashtags, ["#coffee", "#beans"])
+
+    def test_parse_code_fenced_json(self):
+        """JSON wrapped in a markdown code fence, with or without a language tag, is unwrapped."""
+        client = gemini_client.GeminiClient()
+        body = '{"caption": "Fresh coffee", "hashtags": ["#coffee"]}'
+        for text in (f"```json\n{body}\n```", f"```JSON\n{body}\n```", f"```\n{body}\n```", f"\n  {body}  \n"):
+            with self.subTest(text=text):
+                self.assertEqual(client._parse_caption_and_hashtags(text), ("Fresh coffee", ["#coffee"]))
+
+    def test_parse_duplicate_and_mixed_hashtags(self):
+        """Repeats are dropped case-insensitively, first-seen order is kept, and the cap applies."""
+        client = gemini_client.GeminiClient()
+        tags = ["Coffee", "#beans", "#coffee", "beans", "#LATTE #espresso", "latte"]
+        _, hashtags = client._parse_caption_and_hashtags(
+            json.dumps({"caption": "Fresh coffee", "hashtags": tags})
+        )
+        self.assertEqual(hashtags, ["#Coffee", "#beans", "#LATTE", "#espresso"])
+
+        # A single string of tags is parsed the same way as a list
+        _, hashtags = client._parse_caption_and_hashtags('{"caption": "Fresh coffee", "hashtags": "#a b,#c"}')
+        self.assertEqual(hashtags, ["#a", "#b", "#c"])
+
+        many = [f"tag{n}" for n in range(gemini_client.Config.MAX_HASHTAGS + 5)] * 2
+        _, hashtags = client._parse_caption_and_hashtags(
+            json.dumps({"caption": "Fresh coffee", "hashtags": many})
+        )
+        self.assertEqual(hashtags, [f"#{tag}" for tag in many[:gemini_client.Config.MAX_HASHTAGS]])
+
+    def test_hashtag_re(self):
+        """HASHTAG_RE takes one tag per word, with or without '#'."""
+        tags = [m.group(1) for m in gemini_client.HASHTAG_RE.finditer("#coffee, beans\n#latte_art #2024")]
+        self.assertEqual(tags, ["coffee", "beans", "latte_art", "2024"])
+
+    def test_parse_malformed_output_falls_back(self):
+        """A reply that isn't a JSON object is used as the caption, with its inline #tags as hashtags."""
+        client = gemini_client.GeminiClient()
+        caption, hashtags = client._parse_caption_and_hashtags(
+            "Start your morning right with our beans! #coffee #Beans #coffee"
+        )
+        self.assertEqual(caption, "Start your morning right with our beans!")
+        self.assertEqual(hashtags, ["#coffee", "#Beans"])
+
+        for text in ('{"caption": "Fresh coffee", "hashtags": [', '["not", "an", "object"]'):
+            with self.subTest(text=text):
+                caption, hashtags = client._parse_caption_and_hashtags(text)
+                self.assertEqual(caption, text)
+                self.assertEqual(hashtags, [])
+
+    def test_parse_empty_output_raises(self):
+        """An empty reply, or JSON without a caption, is still an error."""
+        client = gemini_client.GeminiClient()
+        for text in ("", "```json\n```", '{"hashtags": ["coffee"]}'):
+            with self.subTest(text=text), self.assertRaises(Exception):
+                client._parse_caption_and_hashtags(text)
+
+    def test_generate_caption_and_hashtags(self):
+        """The combined request parses the model reply, and wraps failures in the usual error."""
+        client = gemini_client.GeminiClient()
+        self.model.generate_content.return_value.text = '```json\n{"caption": "Fresh coffee", "hashtags": ["coffee"]}\n```'
+        self.assertEqual(
+            client.generate_caption_and_hashtags({"description": "Coffee"}),
+            ("Fresh coffee", ["#coffee"])
+        )
+
+        self.model.generate_content.return_value.text = ""
+        with self.assertRaisesRegex(Exception, "Failed to generate caption and hashtags: No caption generated"):
+            client.generate_caption_and_hashtags({"description": "Coffee"})
+
+class InstagramClientTestCase(unittest.TestCase):
+    """Base for InstagramClient tests: a fake clock and mock HTTP transports."""
+
+    def setUp(self):
+        """Replace the client module's clock with a fake one."""
+        self.clock = FakeClock()
+        patcher = patch.object(instagram_client, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Start each test with a fresh process-wide rate limit budget
+        patcher = patch.object(instagram_client, "_shared_limiter", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_client(self, handler):
+        """Build an InstagramClient whose sync calls go to a mock transport."""
+        http = httpx.Client(transport=httpx.MockTransport(handler))
+        self.addCleanup(http.close)
+        patcher = patch.object(instagram_client, "get_shared_client", return_value=http)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        client = instagram_client.InstagramClient()
+        client._retry_delay = Mock(return_value=0.0)
+        return client
+
+    def mock_async_transport(self, handler):
+        """Route the client's async calls to a mock transport."""
+        async_client = httpx.AsyncClient
+        patcher = patch.object(
+            instagram_client.httpx, "AsyncClient",
+            side_effect=lambda **kwargs: async_client(transport=httpx.MockTransport(handler))
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+class TestRateLimiting(InstagramClientTestCase):
+    """Test the Graph API rate limiter and the holds taken from response headers."""
+
+    def test_calls_beyond_budget_wait_for_the_window(self):
+        """Calls past the hourly budget wait until the oldest call leaves the window."""
+        limiter = instagram_client.RateLimiter(3, period=3600.0)
+        for _ in range(3):
+            limiter.acquire("media")
+            self.clock.now += 10
+        self.assertEqual(self.clock.sleeps, [])
+
+        limiter.acquire("media")
+        self.assertEqual(self.clock.sleeps, [3600.0 - 30])
+
+        # Each endpoint has its own budget
+        limiter.acquire("me")
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+    def test_async_acquire_waits_without_blocking(self):
+        """acquire_async sleeps through asyncio for the same time acquire would block."""
+        limiter = instagram_client.RateLimiter(1, period=60.0)
+
+        async def acquire_twice():
+            await limiter.acquire_async("media")
+            await limiter.acquire_async("media")
+
+        with patch("asyncio.sleep", self.clock.async_sleep):
+            asyncio.run(acquire_twice())
+        self.assertEqual(self.clock.sleeps, [60.0])
+
+    def test_configured_budget(self):
+        """The client's limiter is sized from INSTAGRAM_CALLS_PER_HOUR."""
+        with patch.object(instagram_client.Config, "INSTAGRAM_CALLS_PER_HOUR", 2):
+            client = self.make_client(lambda request: httpx.Response(200, json={"id": "1"}))
+        for _ in range(3):
+            client.get_account_info()
+        self.assertEqual(self.clock.sleeps, [3600.0])
+
+    def test_budget_is_shared_by_clients(self):
+        """Every client in the process draws on the same per-endpoint budget."""
+        with patch.object(instagram_client.Config, "INSTAGRAM_CALLS_PER_HOUR", 2):
+            first = self.make_client(lambda request: httpx.Response(200, json={"id": "1"}))
+            second = instagram_client.InstagramClient()
+        self.assertIs(first.limiter, second.limiter)
+
+        first.get_account_info()
+        second.get_account_info()
+        self.assertEqual(self.clock.sleeps, [])
+        second.get_account_info()
+        self.assertEqual(self.clock.sleeps, [3600.0])
+
+    def test_usage_hold(self):
+        """Usage near 100% holds the endpoint until Graph says access is regained."""
+        client = self.make_client(lambda request: httpx.Response(200))
+
+        def usage(**entry):
+            return json.dumps({"1234": [dict({"call_count": 10, "total_time": 10, "total_cputime": 10}, **entry)]})
+
+        self.assertEqual(client._usage_hold(None), 0.0)
+        self.assertEqual(client._usage_hold("not json"), 0.0)
+        self.assertEqual(client._usage_hold(usage(call_count=94)), 0.0)
+        self.assertEqual(client._usage_hold(usage(total_cputime=99, estimated_time_to_regain_access=5)), 300)
+        self.assertEqual(client._usage_hold(usage(call_count=100)), instagram_client.DEFAULT_RETRY_AFTER)
+
+        # Headers that aren't a dict of lists of dicts are ignored
+        for header in ('[]', '{"1234": {}}', '{"1234": [1]}', '{"1234": 5}', '{"1234": [{"call_count": "high"}]}', 'null'):
+            with self.subTest(header=header):
+                self.assertEqual(client._usage_hold(header), 0.0)
+
+    def test_malformed_usage_header_does_not_fail_call(self):
+        """A response with a malformed usage header is still returned to the caller."""
+        client = self.make_client(
+            lambda request: httpx.Response(200, json={"id": "1"}, headers={"X-Business-Use-Case-Usage": '{"1234": [1]}'})
+        )
+        self.assertEqual(client.get_account_info(), {"id": "1"})
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_usage_header_holds_next_call(self):
+        """A response reporting usage near 100% delays the next call to that endpoint."""
+        header = json.dumps({"1234": [{"call_count": 97, "estimated_time_to_regain_access": 2}]})
+        client = self.make_client(
+            lambda request: httpx.Response(200, json={"id": "1"}, headers={"X-Business-Use-Case-Usage": header})
+        )
+
+        client.get_account_info()
+        self.assertEqual(self.clock.sleeps, [])
+        client.get_account_info()
+        self.assertEqual(self.clock.sleeps, [120])
+
+    def test_retry_after_honoured(self):
+        """A 429 holds the endpoint for Retry-After seconds before the retry goes out."""
+        sent = []
+
+        def handler(request):
+            sent.append(self.clock.now)
+            if len(sent) == 1:
+                return httpx.Response(429, headers={"Retry-After": "42"})
+            return httpx.Response(200, json={"id": "1"})
+
+        client = self.make_client(handler)
+        self.assertEqual(client.get_account_info(), {"id": "1"})
+        self.assertEqual(sent[1] - sent[0], 42)
+
+    def test_retry_after_default(self):
+        """A 429 without a usable Retry-After holds the endpoint for DEFAULT_RETRY_AFTER."""
+        responses = iter([httpx.Response(429, headers={"Retry-After": "soon"}), httpx.Response(200, json={})])
+        client = self.make_client(lambda request: next(responses))
+
+        client.get_account_info()
+        self.assertEqual(self.clock.sleeps, [0.0, instagram_client.DEFAULT_RETRY_AFTER])
+
+class TestInstagramRequests(InstagramClientTestCase):
+    """Test paging and the async posting flow against mock transports."""
+
+    def paged_handler(self, pages, requests):
+        """Serve `pages` of posts, each linking to the next through paging.next."""
+        def handler(request):
+            requests.append(request)
+            index = int(request.url.params.get("page", 0))
+            body = {"data": [{"id": f"{index}-{n}"} for n in range(pages[index])]}
+            if index + 1 < len(pages):
+                body["paging"] = {"next": f"https://graph.facebook.com/v18.0/me/media?page={index + 1}"}
+            return httpx.Response(200, json=body)
+        return handler
+
+    def test_iter_recent_posts_follows_next(self):
+        """iter_recent_posts follows paging.next until it has `limit` posts."""
+        requests = []
+        client = self.make_client(self.paged_handler([2, 2, 2], requests))
+
+        posts = list(client.iter_recent_posts(limit=5))
+        self.assertEqual([post["id"] for post in posts], ["0-0", "0-1", "1-0", "1-1", "2-0"])
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[0].url.params["limit"], "5")
+        # The next URL is used as given, without the first request's parameters
+        self.assertNotIn("access_token", requests[1].url.params)
+
+    def test_iter_recent_posts_stops_at_limit(self):
+        """No further page is fetched once the limit is reached."""
+        requests = []
+        client = self.make_client(self.paged_handler([3, 3], requests))
+
+        self.assertEqual(len(client.get_recent_posts(limit=3)), 3)
+        self.assertEqual(len(requests), 1)
+
+        # Lazily, a consumer that stops early doesn't fetch more pages either
+        next(client.iter_recent_posts(limit=6))
+        self.assertEqual(len(requests), 2)
+
+    def test_iter_recent_posts_last_page(self):
+        """Iteration ends at the last page even when fewer than `limit` posts exist."""
+        requests = []
+        client = self.make_client(self.paged_handler([2, 1], requests))
+
+        self.assertEqual(len(client.get_recent_posts(limit=10)), 3)
+        self.assertEqual(len(requests), 2)
+
+    def test_aget_recent_posts_follows_next(self):
+        """The async variant pages the same way."""
+        requests = []
+        self.mock_async_transport(self.paged_handler([2, 2, 2], requests))
+        client = instagram_client.InstagramClient()
+
+        async def fetch():
+            try:
+                return await client.aget_recent_posts(limit=3)
+            finally:
+                await client.aclose()
+
+        posts = asyncio.run(fetch())
+        self.assertEqual([post["id"] for post in posts], ["0-0", "0-1", "1-0"])
+        self.assertEqual(len(requests), 2)
+
+    def test_apost_to_feed(self):
+        """apost_to_feed creates a container, then publishes it."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.url.path.endswith("/media"):
+                return httpx.Response(200, json={"id": "container-1"})
+            return httpx.Response(200, json={"id": "post-1"})
+
+        self.mock_async_transport(handler)
+        client = instagram_client.InstagramClient()
+
+        async def post():
+            try:
+                return await client.apost_to_feed("/tmp/coffee.jpg", "Fresh coffee", ["#coffee", "#beans"])
+            finally:
+                await client.aclose()
+
+        result = asyncio.run(post())
+        self.assertTrue(result["success"])
+        self.assertEqual(result["media_id"], "container-1")
+        self.assertEqual(result["publish_result"], {"id": "post-1"})
+
+        self.assertEqual([request.method for request in requests], ["POST", "POST"])
+        self.assertTrue(requests[0].url.path.endswith("/media"))
+        self.assertTrue(requests[1].url.path.endswith("/media_publish"))
+        container = httpx.QueryParams(requests[0].content.decode())
+        self.assertEqual(container["caption"], "Fresh coffee\n\n#coffee #beans")
+        self.assertEqual(container["image_url"], "https://example.com/images/coffee.jpg")
+        self.assertEqual(httpx.QueryParams(requests[1].content.decode())["creation_id"], "container-1")
+
+    def test_apost_to_feed_error(self):
+        """A failed container request is reported, and nothing is published."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(400, text="Invalid image")
+
+        self.mock_async_transport(handler)
+        client = instagram_client.InstagramClient()
+
+        async def post():
+            try:
+                return await client.apost_to_feed("/tmp/coffee.jpg", "Fresh coffee")
+            finally:
+                await client.aclose()
+
+        result = asyncio.run(post())
+        self.assertFalse(result["success"])
+        self.assertIn("Failed to create media container: Invalid image", result["error"])
+        self.assertEqual(len(requests), 1)
+
+class TestRetries(InstagramClientTestCase):
+    """Test which failures each client retries, without waiting out the backoff."""
+
+    def sequence_handler(self, outcomes, requests):
+        """Answer each request with the next status code, or raise a timeout for None."""
+        outcomes = iter(outcomes)
+
+        def handler(request):
+            requests.append(request)
+            status = next(outcomes)
+            if status is None:
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(status, json={"id": "1"})
+        return handler
+
+    def test_get_retries_server_errors_and_timeouts(self):
+        """GETs are retried on 5xx and timeouts, with a backoff between attempts."""
+        requests = []
+        client = self.make_client(self.sequence_handler([503, None, 500, 200], requests))
+
+        self.assertEqual(client.get_account_info(), {"id": "1"})
+        self.assertEqual(len(requests), 4)
+        self.assertEqual([call.args[0] for call in client._retry_delay.call_args_list], [0, 1, 2])
+
+    def test_get_gives_up_after_retry_attempts(self):
+        """The last transient response is returned once RETRY_ATTEMPTS are used up."""
+        requests = []
+        client = self.make_client(self.sequence_handler([502] * 5, requests))
+
+        response = client._request("get", "me", client._me_url)
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(len(requests), instagram_client.RETRY_ATTEMPTS)
+
+        requests.clear()
+        client = self.make_client(self.sequence_handler([None] * 5, requests))
+        with self.assertRaises(httpx.TimeoutException):
+            client._request("get", "me", client._me_url)
+        self.assertEqual(len(requests), instagram_client.RETRY_ATTEMPTS)
+
+    def test_get_does_not_retry_client_errors(self):
+        """A 4xx other than 429 means the request is wrong and is not repeated."""
+        requests = []
+        client = self.make_client(self.sequence_handler([400, 200], requests))
+
+        with self.assertRaises(Exception):
+            client.get_account_info()
+        self.assertEqual(len(requests), 1)
+
+    def test_post_is_never_retried(self):
+        """A publish POST is sent once, whether it fails with a 5xx or times out."""
+        requests = []
+        client = self.make_client(self.sequence_handler([503, 200], requests))
+        result = client.post_to_feed("/tmp/coffee.jpg", "Fresh coffee")
+        self.assertFalse(result["success"])
+        self.assertEqual(len(requests), 1)
+
+        requests.clear()
+        client = self.make_client(self.sequence_handler([None, 200], requests))
+        with self.assertRaises(httpx.TimeoutException):
+            client._request("post", "media", client._media_url, data={})
+        self.assertEqual(len(requests), 1)
+
+    def test_async_get_retries(self):
+        """The async client retries GETs the same way."""
+        requests = []
+        self.mock_async_transport(self.sequence_handler([None, 504, 200], requests))
+        client = instagram_client.InstagramClient()
+        client._retry_delay = Mock(return_value=0.0)
+
+        async def fetch():
+            try:
+                return await client.aget_account_info()
+            finally:
+                await client.aclose()
+
+        with patch("asyncio.sleep", self.clock.async_sleep):
+            self.assertEqual(asyncio.run(fetch()), {"id": "1"})
+        self.assertEqual(len(requests), 3)
+
+    def test_gemini_retries_transient_errors(self):
+        """Transient Gemini errors are retried; other API errors fail on the first call."""
+        with patch.multiple(gemini_client.genai, configure=Mock(), GenerativeModel=Mock()), \
+                patch.object(gemini_client.GeminiClient._generate.retry, "sleep", Mock()):
+            model = gemini_client.genai.GenerativeModel.return_value
+            client = gemini_client.GeminiClient()
+
+            model.generate_content.side_effect = [
+                google_exceptions.ServiceUnavailable("busy"),
+                google_exceptions.TooManyRequests("slow down"),
+                Mock(text="Fresh coffee")
+            ]
+            self.assertEqual(client.generate_caption({"description": "Coffee"}), "Fresh coffee")
+            self.assertEqual(model.generate_content.call_count, 3)
+
+            model.generate_content.reset_mock()
+            model.generate_content.side_effect = google_exceptions.InvalidArgument("bad prompt")
+            with self.assertRaises(Exception):
+                client.generate_caption({"description": "Coffee"})
+            self.assertEqual(model.generate_content.call_count, 1)
+
+            model.generate_content.reset_mock()
+            model.generate_content.side_effect = google_exceptions.InternalServerError("down")
+            with self.assertRaises(Exception):
+                client.generate_caption({"description": "Coffee"})
+            self.assertEqual(model.generate_content.call_count, 4)
+
+    def test_gemini_async_retries_transient_errors(self):
+        """The async Gemini call retries transient errors too."""
+        with patch.multiple(gemini_client.genai, configure=Mock(), GenerativeModel=Mock()), \
+                patch.object(gemini_client.GeminiClient._generate_async.retry, "sleep", AsyncMock()):
+            model = gemini_client.genai.GenerativeModel.return_value
+            model.generate_content_async = AsyncMock(side_effect=[
+                google_exceptions.DeadlineExceeded("slow"),
+                Mock(text="Fresh coffee")
+            ])
+            client = gemini_client.GeminiClient()
+
+            caption = asyncio.run(client.generate_caption_async({"description": "Coffee"}))
+            self.assertEqual(caption, "Fresh coffee")
+            self.assertEqual(model.generate_content_async.await_count, 2)
+
+    def test_cerebrus_retries_transient_responses(self):
+        """Cerebrus calls are retried on 429/5xx and connection errors, not on other 4xx."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if len(requests) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            if len(requests) == 2:
+                return httpx.Response(503)
+            if len(requests) == 3:
+                return httpx.Response(429)
+            return httpx.Response(200, json={"confirmed": True})
+
+        client = cerebrus_client.CerebrusClient()
+        client.close()
+        self.addCleanup(client.close)
+        client.client = httpx.Client(base_url="https://cerebrus.test", transport=httpx.MockTransport(handler))
+
+        with patch.object(cerebrus_client.CerebrusClient._send_to_cerebrus.retry, "sleep", Mock()):
+            self.assertTrue(client.confirm_posting_preferences("session", {}))
+            self.assertEqual(len(requests), 4)
+
+            requests.clear()
+            client.close()
+            client.client = httpx.Client(
+                base_url="https://cerebrus.test",
+                transport=httpx.MockTransport(lambda request: requests.append(request) or httpx.Response(403))
+            )
+            with self.assertRaises(Exception):
+                client.confirm_posting_preferences("session", {})
+            self.assertEqual(len(requests), 1)
+
+def run_client_tests():
+    """Run all client tests and return results."""
+    test_classes = (TestGeminiClient, TestRateLimiting, TestInstagramRequests, TestRetries)
+    results = [run_tests(test_cls) for test_cls in test_classes]
+    return {
+        "tests_run": sum(r["tests_run"] for r in results),
+        "failures": sum(r["failures"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "success": all(r["success"] for r in results),
+        "failure_details": [d for r in results for d in r["failure_details"]],
+        "error_details": [d for r in results for d in r["error_details"]]
+    }
+
+if __name__ == "__main__":
+    results = run_client_tests()
+    sys.exit(0 if results["success"] else 1)
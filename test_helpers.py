@@ -0,0 +1,32 @@
+"""Helpers shared by the test modules: temporary directories, progress output and the runner."""
+
+import os
+import tempfile
+import unittest
+
+# CI gets one character per test
+RUNNER_VERBOSITY = 1 if os.environ.get("CI") else 2
+TEST_LOADER = unittest.TestLoader()
+
+def report(message):
+    """Print a test's progress line, except on CI where the runner output is enough."""
+    if not os.environ.get("CI"):
+        print(message)
+
+def make_test_dir() -> str:
+    """Create a temporary test data directory, RAM-backed (/dev/shm) where available."""
+    return tempfile.mkdtemp(prefix="test_data_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+def run_tests(test_cls) -> dict:
+    """Run every test in a TestCase class and return the results summary."""
+    suite = TEST_LOADER.loadTestsFromTestCase(test_cls)
+    result = unittest.TextTestRunner(verbosity=RUNNER_VERBOSITY).run(suite)
+    
+    return {
+        "tests_run": result.testsRun,
+        "failures": len(result.failures),
+        "errors": len(result.errors),
+        "success": result.wasSuccessful(),
+        "failure_details": [str(f[1]) for f in result.failures],
+        "error_details": [str(e[1]) for e in result.errors]
+    }
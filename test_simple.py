@@ -2,43 +2,67 @@
 
 import sys
 import os
+import shutil
 import unittest
+from functools import lru_cache
 from unittest.mock import Mock, patch, MagicMock
 import json
-from datetime import datetime
+import random
+import re
+import sqlite3
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from test_helpers import make_test_dir, report, run_tests
+import storage
+
+@lru_cache(maxsize=None)
+def _read(path):
+    """Read a project file once, reusing its contents across tests."""
+    with open(path, 'r') as f:
+        return f.read()
+
 class TestInstagramAgentSimple(unittest.TestCase):
     """Simplified test cases for the Instagram Advertisement Agent."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create test data directory
-        os.makedirs('./test_data', exist_ok=True)
+    @classmethod
+    def setUpClass(cls):
+        """Create the test data directory and storage once for the class."""
+        # A RAM-backed directory where available, for tests that need database files
+        cls.test_dir = make_test_dir()
+        
+        # Tests that don't need a database file share an in-memory storage
+        cls.storage = storage.ContentStorage(storage.MEMORY_PATH)
     
-    def tearDown(self):
-        """Clean up after tests."""
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests."""
+        cls.storage.close()
         # Clean up test data
-        import shutil
-        if os.path.exists('./test_data'):
-            shutil.rmtree('./test_data')
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        # Start each test from empty history
+        self.storage.reset()
     
     def test_storage_system_basic(self):
         """Test the basic storage system functionality."""
         try:
             # Import storage module directly
-            import storage
-            
-            # Create storage instance
-            storage_instance = storage.ContentStorage('./test_data')
+            # Use the shared storage instance
+            storage_instance = self.storage
             
             # Test adding a prompt
             prompt_id = storage_instance.add_prompt("Test prompt for coffee beans", {"test": True})
             self.assertIsNotNone(prompt_id)
             self.assertTrue(prompt_id)
             
+            # Test looking a prompt up by its normalized words
+            self.assertEqual(storage_instance.find_prompt("test prompt for  Coffee beans")["id"], 1)
+            self.assertIsNone(storage_instance.find_prompt("Test prompt for tea"))
+            
             # Test adding a caption
             caption_id = storage_instance.add_caption("Test caption", prompt_id, {"test": True})
             self.assertIsNotNone(caption_id)
@@ -47,36 +71,82 @@ class TestInstagramAgentSimple(unittest.TestCase):
             image_id = storage_instance.add_image("./test_image.jpg", prompt_id, {"test": True})
             self.assertIsNotNone(image_id)
             
+            # Test recording a caption and image together
+            latest_prompt_id = storage_instance.latest_prompt_id()
+            self.assertEqual(latest_prompt_id, 1)
+            bundle_ids = storage_instance.add_content_bundle(
+                "Bundled caption", "./bundled_image.jpg", latest_prompt_id, {"test": True}, {"test": True}
+            )
+            self.assertEqual(bundle_ids, (caption_id + 1, image_id + 1))
+            
             # Test adding a post
             post_id = storage_instance.add_post({"test": "post data"})
             self.assertIsNotNone(post_id)
             
-            print("✅ Storage system basic functionality working")
+            report("✅ Storage system basic functionality working")
             
         except Exception as e:
             self.fail(f"Storage system basic test failed: {str(e)}")
     
+    def test_batched_writes(self):
+        """Test grouping storage writes into one transaction."""
+        try:
+            storage_instance = self.storage
+            
+            # Writes inside a batch are committed together
+            with storage_instance.batch():
+                storage_instance.add_prompt("Batched prompt for coffee beans", {"test": True})
+                storage_instance.add_caption("Batched caption", 1, {"test": True})
+                storage_instance.add_post({"test": "batched post"})
+            self.assertEqual(storage_instance.counts(), {"prompts": 1, "captions": 1, "images": 0, "posts": 1})
+            
+            # A failing batch keeps none of its writes
+            with self.assertRaises(RuntimeError):
+                with storage_instance.batch():
+                    storage_instance.add_prompt("Rolled back prompt about tea", {"test": True})
+                    raise RuntimeError("abort batch")
+            self.assertEqual(storage_instance.counts()["prompts"], 1)
+            self.assertTrue(storage_instance.add_prompt("Rolled back prompt about tea", {"test": True}))
+            
+            # Bulk adds write all their rows in one statement
+            self.assertEqual(storage_instance.add_prompts_bulk([
+                ("Bulk prompt about green tea", {"test": True}),
+                ("Bulk prompt about green tea", {"test": True}),
+                ("Batched prompt for coffee beans", {"test": True})
+            ]), [True, False, False])
+            self.assertEqual(storage_instance.add_captions_bulk([("Bulk caption", 2, {}), ("Other caption", 2, {})]), 2)
+            self.assertEqual(storage_instance.add_images_bulk([("./bulk_image.jpg", 2, {})]), 1)
+            self.assertEqual(storage_instance.add_posts_bulk([{"test": "bulk post"}]), 1)
+            self.assertEqual(storage_instance.counts(), {"prompts": 3, "captions": 3, "images": 1, "posts": 2})
+            self.assertIsNotNone(storage_instance.find_prompt("Bulk prompt about green tea"))
+            
+            report("✅ Batched writes working correctly")
+            
+        except Exception as e:
+            self.fail(f"Batched writes test failed: {str(e)}")
+    
     def test_duplicate_prevention_logic(self):
         """Test duplicate prevention logic."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
-            
-            # Add first prompt
-            prompt1 = storage_instance.add_prompt("Premium coffee beans from Colombia", {"test": True})
+            storage_instance = self.storage
+            
+            # Add a prompt, a very similar one and a completely different one;
+            # each is checked against the prompts added before it
+            prompt1, prompt2, prompt3, prompt4 = storage_instance.add_prompts_bulk([
+                ("Premium coffee beans from Colombia", {"test": True}),
+                ("Premium coffee from Colombia", {"test": True}),
+                ("Fresh organic vegetables from local farm", {"test": True}),
+                ("Premium coffee beans from Colombia", {"test": True})
+            ])
             self.assertTrue(prompt1, "First prompt should be added")
             
-            # Try to add very similar prompt (should be detected as duplicate)
-            prompt2 = storage_instance.add_prompt("Premium coffee from Colombia", {"test": True})
             # Note: The similarity threshold might need adjustment
-            print(f"Similar prompt result: {prompt2}")
+            report(f"Similar prompt result: {prompt2}")
             
-            # Add completely different prompt (should not be duplicate)
-            prompt3 = storage_instance.add_prompt("Fresh organic vegetables from local farm", {"test": True})
             self.assertTrue(prompt3, "Different prompt should not be duplicate")
+            self.assertFalse(prompt4, "Repeated prompt should be detected as duplicate")
             
-            print("✅ Duplicate prevention logic tested")
+            report("✅ Duplicate prevention logic tested")
             
         except Exception as e:
             self.fail(f"Duplicate prevention test failed: {str(e)}")
@@ -84,9 +154,7 @@ class TestInstagramAgentSimple(unittest.TestCase):
     def test_similarity_calculation(self):
         """Test the similarity calculation function."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Test similar texts
             similarity1 = storage_instance._calculate_similarity(
@@ -109,52 +177,231 @@ class TestInstagramAgentSimple(unittest.TestCase):
             )
             self.assertEqual(similarity3, 1.0, "Identical texts should have similarity of 1.0")
             
-            print("✅ Similarity calculation working correctly")
+            report("✅ Similarity calculation working correctly")
             
         except Exception as e:
             self.fail(f"Similarity calculation test failed: {str(e)}")
     
-    def test_json_storage_files(self):
-        """Test JSON storage file creation and management."""
+    def test_prompt_index_matches_full_scan(self):
+        """Test that the prompt index finds exactly the duplicates a brute-force Jaccard scan does."""
         try:
-            import storage
+            threshold = storage.SIMILARITY_THRESHOLD
+            
+            def scan(words, stored):
+                return any(len(words & other) / len(words | other) > threshold for other in stored if words)
+            
+            # Sets at exactly the threshold are not duplicates; one word over is
+            vocab = [f"word{n}" for n in range(40)]
+            for size, removed in ((10, 1), (11, 1), (20, 2), (20, 1), (9, 1), (30, 3)):
+                with self.subTest(size=size, removed=removed):
+                    index = storage.PromptIndex()
+                    base = frozenset(vocab[:size])
+                    index.add(1, base)
+                    subset = frozenset(vocab[removed:size])
+                    self.assertEqual(index.is_duplicate(subset), scan(subset, [base]))
+            self.assertEqual(index.min_overlap, 10)
+            
+            # Random prompts, many of them small edits of earlier ones so plenty
+            # land near the threshold; duplicates are not stored, as in add_prompt
+            rng = random.Random(1234)
+            generated = []
+            for _ in range(600):
+                if generated and rng.random() < 0.6:
+                    words = set(rng.choice(generated))
+                    for word in rng.sample(sorted(words), min(len(words), rng.randint(0, 2))):
+                        words.discard(word)
+                    words.update(rng.sample(vocab, rng.randint(0, 2)))
+                else:
+                    words = set(rng.sample(vocab, rng.randint(0, 25)))
+                generated.append(words)
+            prompts = [" ".join(rng.choice((word, word.upper())) for word in words) for words in generated]
+            
+            index = storage.PromptIndex()
+            stored = []
+            expected = []
+            for prompt_id, prompt in enumerate(prompts, 1):
+                words = storage.tokenize(prompt)
+                duplicate = scan(words, stored)
+                self.assertEqual(index.is_duplicate(words), duplicate, prompt)
+                expected.append(not duplicate)
+                if not duplicate:
+                    index.add(prompt_id, words)
+                    stored.append(words)
+            self.assertGreater(expected.count(False), 50, "The sample should exercise the duplicate path")
+            
+            # The storage's own check and bulk insert agree with the scan too
+            added = self.storage.add_prompts_bulk([(prompt, {}) for prompt in prompts])
+            self.assertEqual(added, expected)
+            for prompt in rng.sample(prompts, 50):
+                self.assertEqual(
+                    self.storage._is_duplicate_prompt(prompt),
+                    scan(storage.tokenize(prompt), stored)
+                )
+            
+            report("✅ Prompt index matches a full scan")
             
-            storage_instance = storage.ContentStorage('./test_data')
+        except Exception as e:
+            self.fail(f"Prompt index test failed: {str(e)}")
+    
+    def test_sqlite_storage_file(self):
+        """Test SQLite storage file creation and legacy JSON migration."""
+        try:
+            # Legacy files are imported when a storage opens, so use a fresh directory
+            legacy_dir = os.path.join(self.test_dir, 'legacy')
+            os.makedirs(legacy_dir, exist_ok=True)
+            
+            # Write a legacy JSON history file before the storage starts
+            legacy_prompts = [{
+                "id": 1,
+                "prompt": "Legacy prompt",
+                "timestamp": "2024-01-15T10:30:00.123456",
+                "metadata": {"test": True}
+            }]
+            with open(os.path.join(legacy_dir, 'prompts_history.json'), 'w') as f:
+                json.dump(legacy_prompts, f)
+            
+            storage_instance = storage.ContentStorage(legacy_dir)
+            
+            # Check if the database file exists
+            self.assertTrue(os.path.exists(storage_instance.db_file))
+            
+            # Legacy entries are imported and the JSON file is set aside
+            recent_prompts = storage_instance.get_recent_prompts(10)
+            self.assertEqual(recent_prompts, legacy_prompts)
+            self.assertFalse(os.path.exists(storage_instance.prompts_file))
+            self.assertTrue(os.path.exists(os.path.join(legacy_dir, 'prompts_history.json.migrated')))
+            
+            # Reopening the storage does not import the entries again
+            storage_instance = storage.ContentStorage(legacy_dir)
+            self.assertEqual(storage_instance.counts()["prompts"], 1)
+            
+            report("✅ SQLite storage file working correctly")
+            
+        except Exception as e:
+            self.fail(f"SQLite storage file test failed: {str(e)}")
+    
+    def test_legacy_migration_with_repeated_ids(self):
+        """Test that legacy rows whose ids repeat after a cleanup are all imported."""
+        try:
+            legacy_dir = os.path.join(self.test_dir, 'repeated_ids')
+            os.makedirs(legacy_dir, exist_ok=True)
+            
+            # The JSON storage numbered entries len(history) + 1, so ids repeat after a cleanup
+            timestamp = "2024-01-15T10:30:00.123456"
+            legacy_prompts = [
+                {"id": prompt_id, "prompt": f"Legacy prompt {n}", "timestamp": timestamp, "metadata": {}}
+                for n, prompt_id in enumerate([4, 5, 3, 4])
+            ]
+            legacy_captions = [{"id": 1, "prompt_id": 4, "caption": "Legacy caption", "timestamp": timestamp, "metadata": {}}]
+            for name, entries in (('prompts_history.json', legacy_prompts), ('captions_history.json', legacy_captions)):
+                with open(os.path.join(legacy_dir, name), 'w') as f:
+                    json.dump(entries, f)
             
-            # Check if storage files exist
-            self.assertTrue(os.path.exists(storage_instance.prompts_file))
-            self.assertTrue(os.path.exists(storage_instance.captions_file))
-            self.assertTrue(os.path.exists(storage_instance.images_file))
-            self.assertTrue(os.path.exists(storage_instance.posts_file))
+            storage_instance = storage.ContentStorage(legacy_dir)
             
-            # Test loading JSON data
-            prompts = storage_instance._load_json(storage_instance.prompts_file)
-            self.assertIsInstance(prompts, list)
+            # Every row gets a new id, in file order
+            prompts = storage_instance.get_recent_prompts(10)
+            self.assertEqual([p["prompt"] for p in prompts], [f"Legacy prompt {n}" for n in (3, 2, 1, 0)])
+            self.assertEqual([p["id"] for p in prompts], [4, 3, 2, 1])
             
-            # Test saving JSON data
-            test_data = [{"test": "data", "timestamp": datetime.now().isoformat()}]
-            storage_instance._save_json(storage_instance.prompts_file, test_data)
+            # The caption points at the last prompt that had its legacy id
+            self.assertEqual(storage_instance.get_recent_captions(1)[0]["prompt_id"], 4)
+            storage_instance.close()
             
-            # Verify data was saved
-            loaded_data = storage_instance._load_json(storage_instance.prompts_file)
-            self.assertEqual(len(loaded_data), 1)
-            self.assertEqual(loaded_data[0]["test"], "data")
+            report("✅ Legacy migration with repeated ids working correctly")
             
-            print("✅ JSON storage files working correctly")
+        except Exception as e:
+            self.fail(f"Legacy migration with repeated ids test failed: {str(e)}")
+    
+    def test_schema_upgrade_keeps_rows(self):
+        """Test that a database from an older schema is upgraded in place without losing rows."""
+        try:
+            # The first SQLite schema: ISO TEXT timestamps, ids without
+            # AUTOINCREMENT and no stored prompt tokens
+            old_schema = """
+            CREATE TABLE prompts (id INTEGER PRIMARY KEY, prompt TEXT NOT NULL, timestamp TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}');
+            CREATE TABLE captions (id INTEGER PRIMARY KEY, prompt_id INTEGER, caption TEXT, timestamp TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}');
+            CREATE TABLE images (id INTEGER PRIMARY KEY, prompt_id INTEGER, image_path TEXT, timestamp TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}');
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, post_data TEXT NOT NULL DEFAULT '{}');
+            CREATE INDEX prompts_timestamp ON prompts (timestamp);
+            CREATE INDEX captions_timestamp ON captions (timestamp);
+            CREATE INDEX images_timestamp ON images (timestamp);
+            CREATE INDEX posts_timestamp ON posts (timestamp);
+            """
+            old_dir = os.path.join(self.test_dir, 'old_schema')
+            os.makedirs(old_dir, exist_ok=True)
+            
+            timestamps = ["2024-01-15T10:30:00.123456", "2024-01-16T08:00:00", "2024-02-01T23:59:59.000001"]
+            words = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda"
+            db = sqlite3.connect(os.path.join(old_dir, storage.DB_FILENAME))
+            with db:
+                db.executescript(old_schema)
+                db.executemany(
+                    "INSERT INTO prompts VALUES (?, ?, ?, ?)",
+                    [(3, "Old prompt one", timestamps[0], '{"n": 1}'), (7, words, timestamps[1], '{}')]
+                )
+                db.execute("INSERT INTO captions VALUES (1, 7, 'Old caption', ?, '{}')", (timestamps[2],))
+                db.execute("INSERT INTO images VALUES (2, 3, '/tmp/old.jpg', ?, '{}')", (timestamps[0],))
+                db.execute("INSERT INTO posts VALUES (5, ?, '{\"success\": true}')", (timestamps[1],))
+            self.assertEqual(db.execute("PRAGMA user_version").fetchone()[0], 0)
+            db.close()
+            
+            storage_instance = storage.ContentStorage(old_dir)
+            
+            # Rows keep their ids and values; timestamps read back unchanged
+            self.assertEqual(storage_instance.get_recent_prompts(10), [
+                {"id": 7, "prompt": words, "timestamp": timestamps[1], "metadata": {}},
+                {"id": 3, "prompt": "Old prompt one", "timestamp": timestamps[0], "metadata": {"n": 1}}
+            ])
+            self.assertEqual(storage_instance.get_recent_captions(10), [
+                {"id": 1, "prompt_id": 7, "caption": "Old caption", "timestamp": timestamps[2], "metadata": {}}
+            ])
+            self.assertEqual(storage_instance.get_recent_posts(10), [
+                {"id": 5, "timestamp": timestamps[1], "post_data": {"success": True}}
+            ])
+            self.assertEqual(storage_instance.counts(), {"prompts": 2, "captions": 1, "images": 1, "posts": 1})
+            
+            # The tables now have the current layout
+            db = storage_instance.db
+            self.assertEqual(db.execute("PRAGMA user_version").fetchone()[0], storage.SCHEMA_VERSION)
+            for kind in storage.COLUMNS:
+                types = {row[1]: row[2] for row in db.execute(f"PRAGMA table_info({kind})")}
+                table_sql = db.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (kind,)
+                ).fetchone()[0]
+                self.assertEqual(types["timestamp"], "INTEGER", kind)
+                self.assertIn("AUTOINCREMENT", table_sql, kind)
+                self.assertIsInstance(db.execute(f"SELECT timestamp FROM {kind}").fetchone()[0], int)
+            self.assertIn("tokens", {row[1] for row in db.execute("PRAGMA table_info(prompts)")})
+            
+            # Upgraded prompts still count for duplicate checks, and new rows
+            # continue after the old ids
+            self.assertFalse(storage_instance.add_prompt(words.upper(), {}))
+            self.assertTrue(storage_instance.add_prompt("A brand new prompt", {}))
+            self.assertEqual(storage_instance.get_recent_prompts(1)[0]["id"], 8)
+            storage_instance.close()
+            
+            # Reopening finds the database current and leaves the rows alone
+            storage_instance = storage.ContentStorage(old_dir)
+            self.assertEqual(storage_instance.counts()["prompts"], 3)
+            storage_instance.close()
+            
+            report("✅ Schema upgrade working correctly")
             
         except Exception as e:
-            self.fail(f"JSON storage files test failed: {str(e)}")
+            self.fail(f"Schema upgrade test failed: {str(e)}")
     
     def test_data_cleanup(self):
         """Test data cleanup functionality."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Add some test data
-            storage_instance.add_prompt("Test prompt 1", {"test": True})
-            storage_instance.add_prompt("Test prompt 2", {"test": True})
+            added = storage_instance.add_prompts_bulk([
+                ("Test prompt 1", {"test": True}),
+                ("Test prompt 2", {"test": True})
+            ])
+            self.assertEqual(added, [True, True])
             
             # Verify data exists
             recent_prompts = storage_instance.get_recent_prompts(10)
@@ -167,7 +414,7 @@ class TestInstagramAgentSimple(unittest.TestCase):
             recent_prompts_after = storage_instance.get_recent_prompts(10)
             self.assertEqual(len(recent_prompts_after), 0, "Data should be cleaned up")
             
-            print("✅ Data cleanup working correctly")
+            report("✅ Data cleanup working correctly")
             
         except Exception as e:
             self.fail(f"Data cleanup test failed: {str(e)}")
@@ -176,8 +423,7 @@ class TestInstagramAgentSimple(unittest.TestCase):
         """Test configuration structure without importing dependencies."""
         try:
             # Read config file and check structure
-            with open('config.py', 'r') as f:
-                config_content = f.read()
+            config_content = _read('config.py')
             
             # Check for required configuration variables
             required_vars = [
@@ -192,10 +438,12 @@ class TestInstagramAgentSimple(unittest.TestCase):
                 'MAX_HASHTAGS'
             ]
             
-            for var in required_vars:
-                self.assertIn(var, config_content, f"Configuration variable {var} should be defined")
+            # Collect every upper-case identifier once and check the set
+            found = set(re.findall(r"[A-Z][A-Z0-9_]+", config_content))
+            missing = set(required_vars) - found
+            self.assertFalse(missing, f"Configuration variables should be defined: {sorted(missing)}")
             
-            print("✅ Configuration structure is correct")
+            report("✅ Configuration structure is correct")
             
         except Exception as e:
             self.fail(f"Configuration structure test failed: {str(e)}")
@@ -218,10 +466,12 @@ class TestInstagramAgentSimple(unittest.TestCase):
                 'deploy.sh'
             ]
             
-            for file_path in required_files:
-                self.assertTrue(os.path.exists(file_path), f"Required file {file_path} should exist")
+            # One directory scan instead of a stat per file, reporting every missing file at once
+            present = {entry.name for entry in os.scandir('.')}
+            missing = [file_path for file_path in required_files if file_path not in present]
+            self.assertFalse(missing, f"Required files should exist, missing: {missing}")
             
-            print("✅ Project structure is complete")
+            report("✅ Project structure is complete")
             
         except Exception as e:
             self.fail(f"Project structure test failed: {str(e)}")
@@ -229,8 +479,7 @@ class TestInstagramAgentSimple(unittest.TestCase):
     def test_dockerfile_structure(self):
         """Test Dockerfile structure and content."""
         try:
-            with open('Dockerfile', 'r') as f:
-                dockerfile_content = f.read()
+            dockerfile_content = _read('Dockerfile')
             
             # Check for required Dockerfile components
             required_components = [
@@ -244,10 +493,12 @@ class TestInstagramAgentSimple(unittest.TestCase):
                 'HEALTHCHECK'
             ]
             
-            for component in required_components:
-                self.assertIn(component, dockerfile_content, f"Dockerfile should contain {component}")
+            # Find every component in one scan of the file
+            pattern = re.compile('|'.join(map(re.escape, required_components)))
+            missing = set(required_components) - set(pattern.findall(dockerfile_content))
+            self.assertFalse(missing, f"Dockerfile should contain {sorted(missing)}")
             
-            print("✅ Dockerfile structure is correct")
+            report("✅ Dockerfile structure is correct")
             
         except Exception as e:
             self.fail(f"Dockerfile structure test failed: {str(e)}")
@@ -255,46 +506,35 @@ class TestInstagramAgentSimple(unittest.TestCase):
     def test_requirements_structure(self):
         """Test requirements.txt structure."""
         try:
-            with open('requirements.txt', 'r') as f:
-                requirements_content = f.read()
+            requirements_content = _read('requirements.txt')
             
             # Check for required packages
             required_packages = [
                 'requests',
                 'google-generativeai',
                 'python-dotenv',
-                'schedule',
+                'croniter',
                 'Pillow',
                 'Flask'
             ]
             
-            for package in required_packages:
-                self.assertIn(package, requirements_content, f"Requirements should include {package}")
+            # Package names, without extras or version specifiers
+            packages = {
+                re.split(r'[\s\[=<>~!;]', line.strip(), maxsplit=1)[0]
+                for line in requirements_content.splitlines()
+                if line.strip() and not line.strip().startswith('#')
+            }
+            missing = set(required_packages) - packages
+            self.assertFalse(missing, f"Requirements should include {sorted(missing)}")
             
-            print("✅ Requirements structure is correct")
+            report("✅ Requirements structure is correct")
             
         except Exception as e:
             self.fail(f"Requirements structure test failed: {str(e)}")
 
 def run_simple_tests():
     """Run all simplified tests and return results."""
-    # Create test suite
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromTestCase(TestInstagramAgentSimple)
-    
-    # Run tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Return test results
-    return {
-        "tests_run": result.testsRun,
-        "failures": len(result.failures),
-        "errors": len(result.errors),
-        "success": result.wasSuccessful(),
-        "failure_details": [str(f[1]) for f in result.failures],
-        "error_details": [str(e[1]) for e in result.errors]
-    }
+    return run_tests(TestInstagramAgentSimple)
 
 if __name__ == "__main__":
     print("🧪 Running Simplified Instagram Advertisement Agent Tests")
@@ -2,6 +2,7 @@
 
 import sys
 import os
+import shutil
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import json
@@ -10,6 +11,9 @@ from datetime import datetime
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from test_helpers import make_test_dir, run_tests as run_test_case
+from storage import ContentStorage
+
 class TestInstagramAgent(unittest.TestCase):
     """Test cases for the Instagram Advertisement Agent."""
     
@@ -23,20 +27,30 @@ class TestInstagramAgent(unittest.TestCase):
             'INSTAGRAM_ACCESS_TOKEN': 'test_instagram_token',
             'INSTAGRAM_APP_ID': 'test_app_id',
             'INSTAGRAM_APP_SECRET': 'test_app_secret',
-            'STORAGE_PATH': './test_data'
+            'STORAGE_PATH': self.test_dir
         })
         self.env_patcher.start()
         
-        # Create test data directory
-        os.makedirs('./test_data', exist_ok=True)
+        # Start each test from empty history
+        self.storage.reset()
     
     def tearDown(self):
         """Clean up after tests."""
         self.env_patcher.stop()
+    
+    @classmethod
+    def setUpClass(cls):
+        """Create the test data directory and storage once for the class."""
+        # A RAM-backed directory where available, so the database never touches disk
+        cls.test_dir = make_test_dir()
+        cls.storage = ContentStorage(cls.test_dir)
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests."""
+        cls.storage.close()
         # Clean up test data
-        import shutil
-        if os.path.exists('./test_data'):
-            shutil.rmtree('./test_data')
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
     
     def test_config_validation(self):
         """Test configuration validation."""
@@ -50,9 +64,7 @@ class TestInstagramAgent(unittest.TestCase):
     def test_storage_system(self):
         """Test the storage system."""
         try:
-            from storage import ContentStorage
-            
-            storage = ContentStorage('./test_data')
+            storage = self.storage
             
             # Test adding a prompt
             prompt_id = storage.add_prompt("Test prompt for coffee beans", {"test": True})
@@ -109,8 +121,8 @@ class TestInstagramAgent(unittest.TestCase):
         except Exception as e:
             self.fail(f"Gemini client test failed: {str(e)}")
     
-    @patch('requests.post')
-    @patch('requests.get')
+    @patch('httpx.Client.post')
+    @patch('httpx.Client.get')
     def test_instagram_client(self, mock_get, mock_post):
         """Test Instagram client with mocked API."""
         try:
@@ -132,12 +144,21 @@ class TestInstagramAgent(unittest.TestCase):
         except Exception as e:
             self.fail(f"Instagram client test failed: {str(e)}")
     
+    @patch('instagram_agent.ContentStorage')
     @patch('cerebrus_client.CerebrusClient')
     @patch('gemini_client.GeminiClient')
     @patch('instagram_client.InstagramClient')
-    def test_instagram_agent(self, mock_instagram, mock_gemini, mock_cerebrus):
+    def test_instagram_agent(self, mock_instagram, mock_gemini, mock_cerebrus, mock_storage):
         """Test the main Instagram agent."""
         try:
+            # Mock the storage so the agent never touches disk
+            mock_storage_instance = Mock()
+            mock_storage_instance.counts.return_value = {"prompts": 0, "captions": 0, "images": 0, "posts": 0}
+            mock_storage_instance.get_recent_prompts.return_value = []
+            mock_storage_instance.get_recent_captions.return_value = []
+            mock_storage_instance.get_recent_posts.return_value = []
+            mock_storage.return_value = mock_storage_instance
+            
             # Mock the clients
             mock_cerebrus_instance = Mock()
             mock_cerebrus_instance.collect_user_input.return_value = {
@@ -176,6 +197,7 @@ class TestInstagramAgent(unittest.TestCase):
             analytics = agent.get_analytics()
             self.assertIsNotNone(analytics)
             self.assertIn("total_prompts", analytics)
+            self.assertEqual(analytics["total_prompts"], 0)
             
         except Exception as e:
             self.fail(f"Instagram agent test failed: {str(e)}")
@@ -199,9 +221,7 @@ class TestInstagramAgent(unittest.TestCase):
     def test_duplicate_prevention(self):
         """Test duplicate prevention logic."""
         try:
-            from storage import ContentStorage
-            
-            storage = ContentStorage('./test_data')
+            storage = self.storage
             
             # Add first prompt
             prompt1 = storage.add_prompt("Premium coffee beans from Colombia", {"test": True})
@@ -221,9 +241,7 @@ class TestInstagramAgent(unittest.TestCase):
     def test_data_cleanup(self):
         """Test data cleanup functionality."""
         try:
-            from storage import ContentStorage
-            
-            storage = ContentStorage('./test_data')
+            storage = self.storage
             
             # Add some test data
             storage.add_prompt("Test prompt 1", {"test": True})
@@ -241,23 +259,7 @@ class TestInstagramAgent(unittest.TestCase):
 
 def run_tests():
     """Run all tests and return results."""
-    # Create test suite
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromTestCase(TestInstagramAgent)
-    
-    # Run tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Return test results
-    return {
-        "tests_run": result.testsRun,
-        "failures": len(result.failures),
-        "errors": len(result.errors),
-        "success": result.wasSuccessful(),
-        "failure_details": [str(f[1]) for f in result.failures],
-        "error_details": [str(e[1]) for e in result.errors]
-    }
+    return run_test_case(TestInstagramAgent)
 
 if __name__ == "__main__":
     print("🧪 Running Instagram Advertisement Agent Tests with TestSprite compatibility")
@@ -1,418 +1,442 @@
 """Comprehensive TestSprite-compatible test for Instagram Advertisement Agent."""
 
 import sys
+import importlib
 import os
+import shutil
 import unittest
-from unittest.mock import Mock, patch, MagicMock, mock_open
+from unittest.mock import AsyncMock, Mock, patch, MagicMock, mock_open
+import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from types import MappingProxyType
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from test_helpers import make_test_dir, run_tests
+import storage
+
+# Read-only product fixture shared by the client tests
+PRODUCT_DETAILS = MappingProxyType({
+    "description": "Premium coffee beans from Colombia",
+    "target_audience": "coffee enthusiasts aged 25-45"
+})
+
 class TestInstagramAgentComprehensive(unittest.TestCase):
     """Comprehensive test cases for the Instagram Advertisement Agent."""
     
-    def setUp(self):
-        """Set up test fixtures."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up fixtures shared by every test in the class."""
+        # One temporary directory and environment patch for the whole class
+        cls.class_dir = make_test_dir()
+        
         # Mock environment variables
-        self.env_patcher = patch.dict(os.environ, {
+        cls.env_patcher = patch.dict(os.environ, {
             'CEREBRUS_API_KEY': 'test_cerebrus_key',
             'CEREBRUS_BASE_URL': 'https://test.cerebrus.com',
             'GEMINI_API_KEY': 'test_gemini_key',
             'INSTAGRAM_ACCESS_TOKEN': 'test_instagram_token',
             'INSTAGRAM_APP_ID': 'test_app_id',
             'INSTAGRAM_APP_SECRET': 'test_app_secret',
-            'STORAGE_PATH': './test_data'
+            'STORAGE_PATH': cls.class_dir
         })
-        self.env_patcher.start()
+        cls.env_patcher.start()
+        
+        # Import the modules under test once, after the environment is patched,
+        # so Config reads the test values
+        for name in ("config", "gemini_client", "instagram_client", "instagram_agent", "health_check"):
+            setattr(cls, name, importlib.import_module(name))
         
-        # Create test data directory
-        os.makedirs('./test_data', exist_ok=True)
+        # Tests that only need one storage share an in-memory instance, reset before
+        # each test; test_data_persistence reopens files and keeps its own directory
+        cls.storage = storage.ContentStorage(storage.MEMORY_PATH)
     
-    def tearDown(self):
-        """Clean up after tests."""
-        self.env_patcher.stop()
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests."""
+        cls.storage.close()
+        cls.env_patcher.stop()
         # Clean up test data
-        import shutil
-        if os.path.exists('./test_data'):
-            shutil.rmtree('./test_data')
+        shutil.rmtree(cls.class_dir, ignore_errors=True)
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        # Tests that open files get their own subdirectory; the shared storage starts empty
+        self.test_dir = os.path.join(self.class_dir, self._testMethodName)
+        self.storage.reset()
     
     @patch('dotenv.load_dotenv')
     def test_config_validation(self, mock_load_dotenv):
         """Test configuration validation with mocked dotenv."""
-        try:
-            # Mock the dotenv module
-            with patch.dict('sys.modules', {'dotenv': Mock()}):
-                # Import config after mocking
-                import config
-                
-                # Test configuration validation
-                config.Config.validate()
-                self.assertTrue(True, "Configuration validation passed")
-                
-        except Exception as e:
-            self.fail(f"Configuration validation failed: {str(e)}")
+        # Test configuration validation
+        self.config.Config.validate()
+        self.assertTrue(True, "Configuration validation passed")
     
     def test_storage_system_comprehensive(self):
         """Test the storage system comprehensively."""
-        try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
-            
-            # Test adding multiple prompts
-            prompt_ids = []
-            for i in range(5):
+        storage_instance = self.storage
+        
+        # Test adding multiple prompts; subTest reports each iteration on its own
+        prompt_ids = []
+        for i in range(5):
+            with self.subTest(prompt=i):
                 prompt_id = storage_instance.add_prompt(f"Test prompt {i} for coffee beans", {"test": True, "index": i})
                 prompt_ids.append(prompt_id)
                 self.assertTrue(prompt_id, f"Prompt {i} should be added")
-            
-            # Test adding captions
-            caption_ids = []
-            for i, prompt_id in enumerate(prompt_ids):
+        
+        # Test adding captions
+        caption_ids = []
+        for i, prompt_id in enumerate(prompt_ids):
+            with self.subTest(caption=i):
                 caption_id = storage_instance.add_caption(f"Test caption {i}", prompt_id, {"test": True})
                 caption_ids.append(caption_id)
                 self.assertIsNotNone(caption_id)
-            
-            # Test adding images
-            image_ids = []
-            for i, prompt_id in enumerate(prompt_ids):
+        
+        # Test adding images
+        image_ids = []
+        for i, prompt_id in enumerate(prompt_ids):
+            with self.subTest(image=i):
                 image_id = storage_instance.add_image(f"./test_image_{i}.jpg", prompt_id, {"test": True})
                 image_ids.append(image_id)
                 self.assertIsNotNone(image_id)
-            
-            # Test adding posts
-            post_ids = []
-            for i in range(3):
+        
+        # Test adding posts
+        post_ids = []
+        for i in range(3):
+            with self.subTest(post=i):
                 post_id = storage_instance.add_post({"test": f"post data {i}", "index": i})
                 post_ids.append(post_id)
                 self.assertIsNotNone(post_id)
-            
-            # Test duplicate prevention
-            duplicate_result = storage_instance.add_prompt("Test prompt 0 for coffee beans", {"test": True})
-            self.assertFalse(duplicate_result, "Exact duplicate should be prevented")
-            
-            # Test similar prompt detection
-            similar_result = storage_instance.add_prompt("Test prompt 0 for coffee", {"test": True})
-            self.assertFalse(similar_result, "Similar prompt should be prevented")
-            
-            # Test different prompt (should be allowed)
-            different_result = storage_instance.add_prompt("Fresh organic vegetables from local farm", {"test": True})
-            self.assertTrue(different_result, "Different prompt should be allowed")
-            
-            # Test data retrieval
-            recent_prompts = storage_instance.get_recent_prompts(10)
-            self.assertGreater(len(recent_prompts), 0, "Should have recent prompts")
-            
-            recent_captions = storage_instance.get_recent_captions(10)
-            self.assertGreater(len(recent_captions), 0, "Should have recent captions")
-            
-            recent_posts = storage_instance.get_recent_posts(10)
-            self.assertGreater(len(recent_posts), 0, "Should have recent posts")
-            
-        except Exception as e:
-            self.fail(f"Storage system comprehensive test failed: {str(e)}")
+        
+        # Test duplicate prevention
+        duplicate_result = storage_instance.add_prompt("Test prompt 0 for coffee beans", {"test": True})
+        self.assertFalse(duplicate_result, "Exact duplicate should be prevented")
+        
+        # Test similar prompt detection
+        similar_result = storage_instance.add_prompt("Test prompt 0 for coffee", {"test": True})
+        self.assertFalse(similar_result, "Similar prompt should be prevented")
+        
+        # Test different prompt (should be allowed)
+        different_result = storage_instance.add_prompt("Fresh organic vegetables from local farm", {"test": True})
+        self.assertTrue(different_result, "Different prompt should be allowed")
+        
+        # Test data retrieval
+        recent_prompts = storage_instance.get_recent_prompts(10)
+        self.assertGreater(len(recent_prompts), 0, "Should have recent prompts")
+        
+        recent_captions = storage_instance.get_recent_captions(10)
+        self.assertGreater(len(recent_captions), 0, "Should have recent captions")
+        
+        recent_posts = storage_instance.get_recent_posts(10)
+        self.assertGreater(len(recent_posts), 0, "Should have recent posts")
     
     @patch('google.generativeai.configure')
     @patch('google.generativeai.GenerativeModel')
     def test_gemini_client_comprehensive(self, mock_model_class, mock_configure):
         """Test Gemini client comprehensively with mocked API."""
-        try:
-            # Mock the Gemini API response
-            mock_model = Mock()
-            mock_model.generate_content.return_value.text = "Test caption for coffee beans #coffee #premium #organic"
-            mock_model_class.return_value = mock_model
-            
-            # Mock the google.generativeai module
-            with patch.dict('sys.modules', {'google.generativeai': Mock()}):
-                import gemini_client
-                
-                gemini = gemini_client.GeminiClient()
-                
-                product_details = {
-                    "description": "Premium coffee beans from Colombia",
-                    "target_audience": "coffee enthusiasts aged 25-45"
-                }
-                
-                # Test caption generation
-                caption = gemini.generate_caption(product_details, "professional")
-                self.assertIsNotNone(caption)
-                self.assertIsInstance(caption, str)
-                self.assertGreater(len(caption), 0, "Caption should not be empty")
-                
-                # Test hashtag generation
-                hashtags = gemini.generate_hashtags(product_details, caption)
-                self.assertIsNotNone(hashtags)
-                self.assertIsInstance(hashtags, list)
-                self.assertGreater(len(hashtags), 0, "Should generate hashtags")
-                
-                # Test image generation
-                image_path = gemini.generate_image(product_details, "modern")
-                self.assertIsNotNone(image_path)
-                self.assertIsInstance(image_path, str)
-                self.assertTrue(image_path.endswith('.jpg'), "Should generate JPG image")
-                
-        except Exception as e:
-            self.fail(f"Gemini client comprehensive test failed: {str(e)}")
+        # Mock the Gemini API response
+        mock_model = Mock()
+        mock_model.generate_content.return_value.text = "Test caption for coffee beans #coffee #premium #organic"
+        mock_model_class.return_value = mock_model
+        
+        gemini = self.gemini_client.GeminiClient()
+        product_details = PRODUCT_DETAILS
+        
+        # Test caption generation
+        caption = gemini.generate_caption(product_details, "professional")
+        self.assertIsNotNone(caption)
+        self.assertIsInstance(caption, str)
+        self.assertGreater(len(caption), 0, "Caption should not be empty")
+        
+        # Test hashtag generation
+        hashtags = gemini.generate_hashtags(product_details, caption)
+        self.assertIsNotNone(hashtags)
+        self.assertIsInstance(hashtags, list)
+        self.assertGreater(len(hashtags), 0, "Should generate hashtags")
+        
+        # Test image generation
+        image_path = gemini.generate_image(product_details, "modern")
+        self.assertIsNotNone(image_path)
+        self.assertIsInstance(image_path, str)
+        self.assertTrue(image_path.endswith('.jpg'), "Should generate JPG image")
     
-    @patch('requests.post')
-    @patch('requests.get')
+    @patch('httpx.Client.post')
+    @patch('httpx.Client.get')
     def test_instagram_client_comprehensive(self, mock_get, mock_post):
         """Test Instagram client comprehensively with mocked API."""
-        try:
-            # Mock API responses
-            mock_post.return_value.status_code = 200
-            mock_post.return_value.json.return_value = {"id": "test_media_id"}
-            mock_get.return_value.status_code = 200
-            mock_get.return_value.json.return_value = {
-                "id": "test_account", 
-                "username": "test_user",
-                "account_type": "BUSINESS",
-                "media_count": 100
-            }
-            
-            # Mock the requests module
-            with patch.dict('sys.modules', {'requests': Mock()}):
-                import instagram_client
-                
-                instagram = instagram_client.InstagramClient()
-                
-                # Test account info
-                account_info = instagram.get_account_info()
-                self.assertIsNotNone(account_info)
-                self.assertIn("id", account_info)
-                self.assertIn("username", account_info)
-                
-                # Test feed posting
-                feed_result = instagram.post_to_feed(
-                    "./test_image.jpg",
-                    "Test caption",
-                    ["#coffee", "#premium"]
-                )
-                self.assertIsNotNone(feed_result)
-                self.assertIn("success", feed_result)
-                
-                # Test story posting
-                story_result = instagram.post_to_stories(
-                    "./test_image.jpg",
-                    "Test story caption"
-                )
-                self.assertIsNotNone(story_result)
-                self.assertIn("success", story_result)
-                
-        except Exception as e:
-            self.fail(f"Instagram client comprehensive test failed: {str(e)}")
+        # Mock API responses
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {"id": "test_media_id"}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "id": "test_account", 
+            "username": "test_user",
+            "account_type": "BUSINESS",
+            "media_count": 100
+        }
+        
+        instagram = self.instagram_client.InstagramClient()
+        
+        # Test account info
+        account_info = instagram.get_account_info()
+        self.assertIsNotNone(account_info)
+        self.assertIn("id", account_info)
+        self.assertIn("username", account_info)
+        
+        # Test feed posting
+        feed_result = instagram.post_to_feed(
+            "./test_image.jpg",
+            "Test caption",
+            ["#coffee", "#premium"]
+        )
+        self.assertIsNotNone(feed_result)
+        self.assertIn("success", feed_result)
+        
+        # Test story posting
+        story_result = instagram.post_to_stories(
+            "./test_image.jpg",
+            "Test story caption"
+        )
+        self.assertIsNotNone(story_result)
+        self.assertIn("success", story_result)
     
-    @patch('cerebrus_client.CerebrusClient')
-    @patch('gemini_client.GeminiClient')
-    @patch('instagram_client.InstagramClient')
+    @patch('cerebrus_client.CerebrusClient', autospec=True)
+    @patch('gemini_client.GeminiClient', autospec=True)
+    @patch('instagram_client.InstagramClient', autospec=True)
     def test_instagram_agent_comprehensive(self, mock_instagram, mock_gemini, mock_cerebrus):
         """Test the main Instagram agent comprehensively."""
-        try:
-            # Mock the clients
-            mock_cerebrus_instance = Mock()
-            mock_cerebrus_instance.collect_user_input.return_value = {
-                "product_details": {
-                    "tone": "professional",
-                    "target_audience": "coffee enthusiasts aged 25-45",
-                    "description": "Premium single-origin coffee beans from sustainable farms in Colombia"
-                },
-                "image_preferences": {
-                    "use_ai_generated": True,
-                    "style": "modern and minimalist"
-                },
-                "posting_preferences": {
-                    "post_to_feed": True,
-                    "post_to_stories": True
-                }
-            }
-            mock_cerebrus.return_value = mock_cerebrus_instance
-            
-            mock_gemini_instance = Mock()
-            mock_gemini_instance.generate_caption.return_value = "Discover the rich, bold flavor of our premium Colombian coffee beans. Perfect for the discerning coffee enthusiast who values quality and sustainability. #coffee #premium #sustainable #colombia"
-            mock_gemini_instance.generate_hashtags.return_value = ["#coffee", "#premium", "#sustainable", "#colombia", "#organic"]
-            mock_gemini_instance.generate_image.return_value = "./generated_images/coffee_ad.jpg"
-            mock_gemini.return_value = mock_gemini_instance
-            
-            mock_instagram_instance = Mock()
-            mock_instagram_instance.post_to_feed.return_value = {
-                "success": True, 
-                "media_id": "test_feed_id",
-                "timestamp": datetime.now().isoformat()
-            }
-            mock_instagram_instance.post_to_stories.return_value = {
-                "success": True, 
-                "media_id": "test_story_id",
-                "timestamp": datetime.now().isoformat()
+        # Configure the autospecced instances the agent's clients return
+        mock_cerebrus_instance = mock_cerebrus.return_value
+        mock_cerebrus_instance.collect_user_input.return_value = {
+            "product_details": {
+                "tone": "professional",
+                "target_audience": "coffee enthusiasts aged 25-45",
+                "description": "Premium single-origin coffee beans from sustainable farms in Colombia"
+            },
+            "image_preferences": {
+                "use_ai_generated": True,
+                "style": "modern and minimalist"
+            },
+            "posting_preferences": {
+                "post_to_feed": True,
+                "post_to_stories": True
             }
-            mock_instagram.return_value = mock_instagram_instance
-            
-            # Mock the modules
-            with patch.dict('sys.modules', {
-                'cerebrus_client': Mock(),
-                'gemini_client': Mock(),
-                'instagram_client': Mock(),
-                'config': Mock()
-            }):
-                import instagram_agent
-                
-                agent = instagram_agent.InstagramAdvertisementAgent()
-                
-                # Test analytics
-                analytics = agent.get_analytics()
-                self.assertIsNotNone(analytics)
-                self.assertIn("total_prompts", analytics)
-                self.assertIn("total_captions", analytics)
-                self.assertIn("total_posts", analytics)
-                
-                # Test manual posting workflow
-                agent.run_manual_posting()
-                
-        except Exception as e:
-            self.fail(f"Instagram agent comprehensive test failed: {str(e)}")
+        }
+        
+        # The agent generates the caption and hashtags in one request, alongside the image
+        caption = "Discover the rich, bold flavor of our premium Colombian coffee beans. Perfect for the discerning coffee enthusiast who values quality and sustainability."
+        hashtags = ["#coffee", "#premium", "#sustainable", "#colombia", "#organic"]
+        mock_gemini_instance = mock_gemini.return_value
+        mock_gemini_instance.generate_caption_and_hashtags_async.return_value = (caption, hashtags)
+        mock_gemini_instance.generate_image_async.return_value = "./generated_images/coffee_ad.jpg"
+        
+        # One timestamp serves both mocked post responses
+        ts = datetime.now().isoformat()
+        feed_result = {
+            "success": True, 
+            "media_id": "test_feed_id",
+            "timestamp": ts
+        }
+        story_result = {
+            "success": True, 
+            "media_id": "test_story_id",
+            "timestamp": ts
+        }
+        mock_instagram_instance = mock_instagram.return_value
+        mock_instagram_instance.apost_to_feed.return_value = feed_result
+        mock_instagram_instance.apost_to_stories.return_value = story_result
+        
+        # Config may have been imported before this class patched the environment
+        with patch.multiple(self.config.Config, STORAGE_PATH=self.test_dir, MISSING_VARS=()):
+            agent = self.instagram_agent.InstagramAdvertisementAgent()
+        
+        # Test analytics
+        analytics = agent.get_analytics()
+        self.assertIsNotNone(analytics)
+        self.assertIn("total_prompts", analytics)
+        self.assertIn("total_captions", analytics)
+        self.assertIn("total_posts", analytics)
+        
+        # Test manual posting workflow
+        agent.run_manual_posting()
+        
+        image_path = "./generated_images/coffee_ad.jpg"
+        mock_instagram_instance.apost_to_feed.assert_awaited_once_with(image_path, caption, hashtags)
+        mock_instagram_instance.apost_to_stories.assert_awaited_once_with(image_path, caption)
+        mock_instagram_instance.aclose.assert_awaited_once()
+        
+        # The post and its content were recorded
+        posts = agent.storage.get_recent_posts(10)
+        self.assertEqual(len(posts), 1, "The workflow should record one post")
+        self.assertEqual(posts[0]["post_data"]["results"], {"feed": feed_result, "stories": story_result})
+        self.assertEqual(posts[0]["post_data"]["content"]["caption"], caption)
+        self.assertEqual(agent.get_analytics()["total_captions"], 1)
+        agent.storage.close()
+    
+    def test_run_schedule(self):
+        """Test that the schedule sleeps until each POST_TIME and survives a failed run."""
+        clock = {"now": datetime(2026, 10, 14, 15, 30)}
+        
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock["now"]
+        
+        class StopSchedule(Exception):
+            pass
+        
+        sleeps = []
+        
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                raise StopSchedule()
+            clock["now"] += timedelta(seconds=seconds)
+        
+        runs = []
+        
+        async def fake_run():
+            runs.append(clock["now"])
+            if len(runs) == 1:
+                raise RuntimeError("Gemini unavailable")
+            # The second run takes five minutes
+            clock["now"] += timedelta(minutes=5)
+        
+        agent = Mock(spec=self.instagram_agent.InstagramAdvertisementAgent)
+        agent.run_daily_posting_async = AsyncMock(side_effect=fake_run)
+        
+        with patch.object(self.instagram_agent, "datetime", FakeDatetime), \
+                patch.object(self.instagram_agent.asyncio, "sleep", fake_sleep), \
+                patch.object(self.config.Config, "POST_TIME", "09:15"):
+            with self.assertRaises(StopSchedule):
+                asyncio.run(self.instagram_agent.InstagramAdvertisementAgent._run_schedule(agent))
+        
+        # 15:30 to 09:15 the next day, then a day, then a day less the second run
+        self.assertEqual(sleeps, [17.75 * 3600, 86400.0, 86400.0 - 300])
+        self.assertEqual(runs, [datetime(2026, 10, 15, 9, 15), datetime(2026, 10, 16, 9, 15)])
+        self.assertEqual(agent.run_daily_posting_async.await_count, 2)
     
-    @patch('flask.Flask')
-    def test_health_check_comprehensive(self, mock_flask):
+    def test_health_check_comprehensive(self):
         """Test health check endpoint comprehensively."""
-        try:
-            # Mock Flask
-            mock_app = Mock()
-            mock_app.test_client.return_value.get.return_value.status_code = 200
-            mock_app.test_client.return_value.get.return_value.data = json.dumps({
-                "status": "healthy",
-                "timestamp": datetime.now().isoformat()
-            })
-            mock_flask.return_value = mock_app
-            
-            # Mock the flask module
-            with patch.dict('sys.modules', {'flask': Mock()}):
-                import health_check
-                
-                # Test health check endpoint
-                with health_check.app.test_client() as client:
-                    response = client.get('/health')
-                    self.assertEqual(response.status_code, 200)
-                    
-                    data = json.loads(response.data)
-                    self.assertIn('status', data)
-                    self.assertIn('timestamp', data)
+        # /health looks for the database file, so create one in the storage directory
+        storage.ContentStorage(self.test_dir).close()
+        
+        # Config may have been imported before this class patched the environment,
+        # so point it at the test values directly
+        with patch.multiple(self.config.Config, STORAGE_PATH=self.test_dir, MISSING_VARS=()):
+            # The module's app is already built, so drive it directly with Flask's test client
+            with self.health_check.app.test_client() as client:
+                response = client.get('/health')
+                self.assertEqual(response.status_code, 200)
                 
-        except Exception as e:
-            self.fail(f"Health check comprehensive test failed: {str(e)}")
+                data = json.loads(response.data)
+                self.assertEqual(data['status'], 'healthy')
+                self.assertIn('timestamp', data)
+    
+    def test_status_endpoint(self):
+        """Test the detailed status endpoint reports stored history."""
+        file_storage = storage.ContentStorage(self.test_dir)
+        file_storage.add_prompt("Status endpoint prompt about coffee", {"test": True})
+        file_storage.add_post({"test": "status post"})
+        file_storage.close()
+        
+        # A fresh process-wide storage, opened on the test directory and closed afterwards
+        with patch.multiple(self.config.Config, STORAGE_PATH=self.test_dir, MISSING_VARS=()), \
+                patch.object(self.health_check, '_storage', None):
+            try:
+                with self.health_check.app.test_client() as client:
+                    response = client.get('/status')
+            finally:
+                if self.health_check._storage is not None:
+                    self.health_check._storage.close()
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'healthy')
+        self.assertEqual(data['storage'], {"prompts_count": 1, "captions_count": 0, "posts_count": 1})
+        self.assertEqual(data['recent_activity']['prompts'][0]['prompt'], "Status endpoint prompt about coffee")
+        self.assertEqual(data['recent_activity']['posts'][0]['post_data'], {"test": "status post"})
     
     def test_error_handling(self):
         """Test error handling in various components."""
-        try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
-            
-            # Test with invalid data
-            try:
-                storage_instance.add_prompt("", {})  # Empty prompt
-                # Should not raise exception, but should handle gracefully
-            except Exception:
-                self.fail("Should handle empty prompt gracefully")
-            
-            # Test with None values
-            try:
-                storage_instance.add_caption(None, 1, {})
-                # Should not raise exception, but should handle gracefully
-            except Exception:
-                self.fail("Should handle None caption gracefully")
-            
-            # Test cleanup with invalid parameters
-            try:
-                storage_instance.cleanup_old_data(-1)  # Invalid days
-                # Should not raise exception
-            except Exception:
-                self.fail("Should handle invalid cleanup parameters gracefully")
-            
-        except Exception as e:
-            self.fail(f"Error handling test failed: {str(e)}")
+        storage_instance = self.storage
+        
+        # Each bad input should be handled without raising; an exception fails its subtest
+        cases = [
+            ("empty prompt", storage_instance.add_prompt, ("", {})),
+            ("None caption", storage_instance.add_caption, (None, 1, {})),
+            ("invalid cleanup parameters", storage_instance.cleanup_old_data, (-1,))
+        ]
+        for case, method, args in cases:
+            with self.subTest(case=case):
+                method(*args)
     
     def test_data_persistence(self):
         """Test data persistence across storage instances."""
-        try:
-            import storage
-            
-            # Create first storage instance
-            storage1 = storage.ContentStorage('./test_data')
-            
-            # Add some data
-            prompt_id = storage1.add_prompt("Test persistence prompt", {"test": True})
-            caption_id = storage1.add_caption("Test persistence caption", prompt_id, {"test": True})
-            
-            # Create second storage instance (should load existing data)
-            storage2 = storage.ContentStorage('./test_data')
-            
-            # Verify data persists
-            recent_prompts = storage2.get_recent_prompts(10)
-            self.assertGreater(len(recent_prompts), 0, "Data should persist across instances")
-            
-            # Verify the specific data we added
-            found_prompt = False
-            for prompt in recent_prompts:
-                if prompt["prompt"] == "Test persistence prompt":
-                    found_prompt = True
-                    break
-            self.assertTrue(found_prompt, "Specific prompt should persist")
-            
-        except Exception as e:
-            self.fail(f"Data persistence test failed: {str(e)}")
+        # Create first storage instance
+        storage1 = storage.ContentStorage(self.test_dir)
+        
+        # Add some data
+        prompt_id = storage1.add_prompt("Test persistence prompt", {"test": True})
+        caption_id = storage1.add_caption("Test persistence caption", prompt_id, {"test": True})
+        storage1.close()
+        
+        # Create second storage instance (should load existing data)
+        storage2 = storage.ContentStorage(self.test_dir)
+        self.addCleanup(storage2.close)
+        
+        # Verify data persists
+        recent_prompts = storage2.get_recent_prompts(10)
+        self.assertGreater(len(recent_prompts), 0, "Data should persist across instances")
+        
+        # Verify the specific data we added
+        found_prompt = storage2.find_prompt("Test persistence prompt")
+        self.assertIsNotNone(found_prompt, "Specific prompt should persist")
+        self.assertEqual(found_prompt["prompt"], "Test persistence prompt")
     
     def test_performance_with_large_data(self):
         """Test performance with larger datasets."""
-        try:
-            import storage
-            import time
-            
-            storage_instance = storage.ContentStorage('./test_data')
-            
-            # Add many prompts
-            start_time = time.time()
-            for i in range(100):
-                storage_instance.add_prompt(f"Performance test prompt {i}", {"test": True, "index": i})
-            
-            add_time = time.time() - start_time
-            self.assertLess(add_time, 5.0, "Adding 100 prompts should take less than 5 seconds")
-            
-            # Test retrieval performance
-            start_time = time.time()
-            recent_prompts = storage_instance.get_recent_prompts(50)
-            retrieval_time = time.time() - start_time
-            self.assertLess(retrieval_time, 1.0, "Retrieving 50 prompts should take less than 1 second")
-            
-            # Test duplicate detection performance
-            start_time = time.time()
-            for i in range(20):
-                storage_instance.add_prompt(f"Performance test prompt {i}", {"test": True})
-            duplicate_time = time.time() - start_time
-            self.assertLess(duplicate_time, 2.0, "Duplicate detection should be fast")
-            
-        except Exception as e:
-            self.fail(f"Performance test failed: {str(e)}")
+        import time
+        
+        storage_instance = self.storage
+        
+        # Add many prompts
+        start_time = time.time()
+        added = storage_instance.add_prompts_bulk(
+            [(f"Performance test prompt {i}", {"test": True, "index": i}) for i in range(100)]
+        )
+        
+        add_time = time.time() - start_time
+        self.assertEqual(added.count(True), 100, "All 100 distinct prompts should be added")
+        self.assertLess(add_time, 5.0, "Adding 100 prompts should take less than 5 seconds")
+        
+        # Test retrieval performance
+        start_time = time.time()
+        recent_prompts = storage_instance.get_recent_prompts(50)
+        retrieval_time = time.time() - start_time
+        self.assertEqual(
+            [prompt["metadata"]["index"] for prompt in recent_prompts], list(range(99, 49, -1)),
+            "The 50 newest prompts should come back newest first"
+        )
+        self.assertLess(retrieval_time, 1.0, "Retrieving 50 prompts should take less than 1 second")
+        
+        # Test duplicate detection performance; repeats are caught by the exact
+        # word-set lookup without scoring any candidates
+        start_time = time.time()
+        with patch.object(storage, "jaccard", wraps=storage.jaccard) as mock_jaccard:
+            duplicates = storage_instance.add_prompts_bulk(
+                [(f"Performance test prompt {i}", {"test": True}) for i in range(20)]
+            )
+        duplicate_time = time.time() - start_time
+        self.assertFalse(any(duplicates), "Repeated prompts should all be rejected")
+        mock_jaccard.assert_not_called()
+        self.assertLess(duplicate_time, 2.0, "Duplicate detection should be fast")
 
 def run_comprehensive_tests():
     """Run all comprehensive tests and return results."""
-    # Create test suite
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromTestCase(TestInstagramAgentComprehensive)
-    
-    # Run tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Return test results
-    return {
-        "tests_run": result.testsRun,
-        "failures": len(result.failures),
-        "errors": len(result.errors),
-        "success": result.wasSuccessful(),
-        "failure_details": [str(f[1]) for f in result.failures],
-        "error_details": [str(e[1]) for e in result.errors]
-    }
+    return run_tests(TestInstagramAgentComprehensive)
 
 if __name__ == "__main__":
     print("🧪 Running Comprehensive Instagram Advertisement Agent Tests")
@@ -2,6 +2,8 @@
 
 import sys
 import os
+import re
+import shutil
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import json
@@ -10,40 +12,52 @@ from datetime import datetime
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from test_helpers import make_test_dir, report, run_tests
+import storage
+
 class TestInstagramAgentFinal(unittest.TestCase):
     """Final comprehensive test cases for the Instagram Advertisement Agent."""
     
-    def setUp(self):
-        """Set up test fixtures."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up fixtures shared by every test in the class."""
+        # One temporary directory and environment patch for the whole class
+        cls.class_dir = make_test_dir()
+        
         # Mock environment variables
-        self.env_patcher = patch.dict(os.environ, {
+        cls.env_patcher = patch.dict(os.environ, {
             'CEREBRUS_API_KEY': 'test_cerebrus_key',
             'CEREBRUS_BASE_URL': 'https://test.cerebrus.com',
             'GEMINI_API_KEY': 'test_gemini_key',
             'INSTAGRAM_ACCESS_TOKEN': 'test_instagram_token',
             'INSTAGRAM_APP_ID': 'test_app_id',
             'INSTAGRAM_APP_SECRET': 'test_app_secret',
-            'STORAGE_PATH': './test_data'
+            'STORAGE_PATH': cls.class_dir
         })
-        self.env_patcher.start()
+        cls.env_patcher.start()
         
-        # Create test data directory
-        os.makedirs('./test_data', exist_ok=True)
+        # Tests that only need one storage share an in-memory instance, reset before
+        # each test; test_data_persistence_and_cleanup reopens files in its own directory
+        cls.storage = storage.ContentStorage(storage.MEMORY_PATH)
     
-    def tearDown(self):
-        """Clean up after tests."""
-        self.env_patcher.stop()
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests."""
+        cls.storage.close()
+        cls.env_patcher.stop()
         # Clean up test data
-        import shutil
-        if os.path.exists('./test_data'):
-            shutil.rmtree('./test_data')
+        shutil.rmtree(cls.class_dir, ignore_errors=True)
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        # Tests that open files get their own subdirectory; the shared storage starts empty
+        self.test_dir = os.path.join(self.class_dir, self._testMethodName)
+        self.storage.reset()
     
     def test_storage_system_core(self):
         """Test the core storage system functionality."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Test adding unique prompts
             prompts = [
@@ -115,7 +129,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
             recent_posts = storage_instance.get_recent_posts(10)
             self.assertEqual(len(recent_posts), 5, "Should have 5 recent posts")
             
-            print("✅ Storage system core functionality working correctly")
+            report("✅ Storage system core functionality working correctly")
             
         except Exception as e:
             self.fail(f"Storage system core test failed: {str(e)}")
@@ -123,9 +137,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
     def test_duplicate_prevention_accuracy(self):
         """Test duplicate prevention with various similarity levels."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Test exact duplicate
             prompt1 = storage_instance.add_prompt("Premium coffee beans from Colombia", {"test": True})
@@ -146,7 +158,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
             different1 = storage_instance.add_prompt("Fresh organic vegetables from local farm", {"test": True})
             self.assertTrue(different1, "Different prompt should be allowed")
             
-            print("✅ Duplicate prevention working with appropriate accuracy")
+            report("✅ Duplicate prevention working with appropriate accuracy")
             
         except Exception as e:
             self.fail(f"Duplicate prevention accuracy test failed: {str(e)}")
@@ -154,9 +166,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
     def test_similarity_calculation_accuracy(self):
         """Test similarity calculation with various text pairs."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Test identical texts
             similarity1 = storage_instance._calculate_similarity(
@@ -194,7 +204,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
             )
             self.assertLess(similarity5, 0.1, "Completely different texts should have very low similarity")
             
-            print("✅ Similarity calculation working accurately")
+            report("✅ Similarity calculation working accurately")
             
         except Exception as e:
             self.fail(f"Similarity calculation accuracy test failed: {str(e)}")
@@ -202,10 +212,8 @@ class TestInstagramAgentFinal(unittest.TestCase):
     def test_data_persistence_and_cleanup(self):
         """Test data persistence and cleanup functionality."""
         try:
-            import storage
-            
             # Create first storage instance
-            storage1 = storage.ContentStorage('./test_data')
+            storage1 = storage.ContentStorage(self.test_dir)
             
             # Add test data
             prompt_id = storage1.add_prompt("Test persistence prompt", {"test": True})
@@ -214,7 +222,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
             post_id = storage1.add_post({"test": "persistence data"})
             
             # Create second storage instance (should load existing data)
-            storage2 = storage.ContentStorage('./test_data')
+            storage2 = storage.ContentStorage(self.test_dir)
             
             # Verify data persists
             recent_prompts = storage2.get_recent_prompts(10)
@@ -227,7 +235,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
             recent_prompts_after = storage2.get_recent_prompts(10)
             self.assertEqual(len(recent_prompts_after), 0, "Data should be cleaned up")
             
-            print("✅ Data persistence and cleanup working correctly")
+            report("✅ Data persistence and cleanup working correctly")
             
         except Exception as e:
             self.fail(f"Data persistence and cleanup test failed: {str(e)}")
@@ -235,9 +243,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
     def test_error_handling_robustness(self):
         """Test error handling and robustness."""
         try:
-            import storage
-            
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Test with empty strings
             try:
@@ -267,7 +273,7 @@ class TestInstagramAgentFinal(unittest.TestCase):
             except Exception as e:
                 self.fail(f"Should handle invalid cleanup parameters gracefully: {str(e)}")
             
-            print("✅ Error handling is robust")
+            report("✅ Error handling is robust")
             
         except Exception as e:
             self.fail(f"Error handling robustness test failed: {str(e)}")
@@ -275,17 +281,18 @@ class TestInstagramAgentFinal(unittest.TestCase):
     def test_performance_with_scale(self):
         """Test performance with larger datasets."""
         try:
-            import storage
             import time
             
-            storage_instance = storage.ContentStorage('./test_data')
+            storage_instance = self.storage
             
             # Test adding many prompts
             start_time = time.time()
-            for i in range(50):
-                storage_instance.add_prompt(f"Performance test prompt {i} for coffee beans", {"test": True, "index": i})
+            added = storage_instance.add_prompts_bulk(
+                [(f"Performance test prompt {i} for coffee beans", {"test": True, "index": i}) for i in range(50)]
+            )
             
             add_time = time.time() - start_time
+            self.assertEqual(added.count(True), 50, "All 50 distinct prompts should be added")
             self.assertLess(add_time, 3.0, "Adding 50 prompts should take less than 3 seconds")
             
             # Test retrieval performance
@@ -296,13 +303,17 @@ class TestInstagramAgentFinal(unittest.TestCase):
             
             # Test duplicate detection performance
             start_time = time.time()
-            for i in range(10):
-                # These should be detected as duplicates
-                storage_instance.add_prompt(f"Performance test prompt {i} for coffee beans", {"test": True})
+            results = storage_instance.add_prompts_bulk(
+                [(f"Performance test prompt {i} for coffee beans", {"test": True}) for i in range(10)]
+            )
             duplicate_time = time.time() - start_time
+            
+            # These should all be detected as duplicates
+            rejected = [i for i, added in enumerate(results) if not added]
+            self.assertEqual(rejected, list(range(10)), "Repeated prompts should all be rejected")
             self.assertLess(duplicate_time, 1.0, "Duplicate detection should be fast")
             
-            print("✅ Performance is acceptable for scale")
+            report("✅ Performance is acceptable for scale")
             
         except Exception as e:
             self.fail(f"Performance with scale test failed: {str(e)}")
@@ -321,13 +332,15 @@ class TestInstagramAgentFinal(unittest.TestCase):
                 'health_check.py'
             ]
             
+            # One directory scan instead of a stat per file
+            entries = {entry.name: entry for entry in os.scandir('.')}
+            
+            missing = [file_path for file_path in python_files if file_path not in entries]
+            self.assertFalse(missing, f"Required Python files should exist, missing: {missing}")
+            
+            # Check files are not empty
             for file_path in python_files:
-                self.assertTrue(os.path.exists(file_path), f"Required Python file {file_path} should exist")
-                
-                # Check file is not empty
-                with open(file_path, 'r') as f:
-                    content = f.read()
-                    self.assertGreater(len(content), 0, f"File {file_path} should not be empty")
+                self.assertGreater(entries[file_path].stat().st_size, 0, f"File {file_path} should not be empty")
             
             # Check configuration files
             config_files = [
@@ -337,8 +350,8 @@ class TestInstagramAgentFinal(unittest.TestCase):
                 '.env.example'
             ]
             
-            for file_path in config_files:
-                self.assertTrue(os.path.exists(file_path), f"Required config file {file_path} should exist")
+            missing = [file_path for file_path in config_files if file_path not in entries]
+            self.assertFalse(missing, f"Required config files should exist, missing: {missing}")
             
             # Check documentation files
             doc_files = [
@@ -346,27 +359,26 @@ class TestInstagramAgentFinal(unittest.TestCase):
                 'deploy.sh'
             ]
             
-            for file_path in doc_files:
-                self.assertTrue(os.path.exists(file_path), f"Required doc file {file_path} should exist")
+            missing = [file_path for file_path in doc_files if file_path not in entries]
+            self.assertFalse(missing, f"Required doc files should exist, missing: {missing}")
             
-            # Check Dockerfile structure
+            # Check Dockerfile structure, finding every component in one scan
             with open('Dockerfile', 'r') as f:
                 dockerfile_content = f.read()
-                self.assertIn('FROM python:3.11-slim', dockerfile_content)
-                self.assertIn('WORKDIR /app', dockerfile_content)
-                self.assertIn('COPY requirements.txt', dockerfile_content)
-                self.assertIn('RUN pip install', dockerfile_content)
-                self.assertIn('EXPOSE 8000', dockerfile_content)
-                self.assertIn('HEALTHCHECK', dockerfile_content)
-            
-            # Check requirements.txt structure
+            required_components = ['FROM python:3.11-slim', 'WORKDIR /app', 'COPY requirements.txt', 'RUN pip install', 'EXPOSE 8000', 'HEALTHCHECK']
+            pattern = re.compile('|'.join(map(re.escape, required_components)))
+            missing = set(required_components) - set(pattern.findall(dockerfile_content))
+            self.assertFalse(missing, f"Dockerfile should contain {sorted(missing)}")
+            
+            # Check requirements.txt structure the same way
             with open('requirements.txt', 'r') as f:
                 requirements_content = f.read()
-                required_packages = ['requests', 'google-generativeai', 'python-dotenv', 'schedule', 'Pillow', 'Flask']
-                for package in required_packages:
-                    self.assertIn(package, requirements_content, f"Requirements should include {package}")
+            required_packages = ['requests', 'google-generativeai', 'python-dotenv', 'croniter', 'Pillow', 'Flask']
+            pattern = re.compile('|'.join(map(re.escape, required_packages)))
+            missing = set(required_packages) - set(pattern.findall(requirements_content))
+            self.assertFalse(missing, f"Requirements should include {sorted(missing)}")
             
-            print("✅ Project structure is complete and correct")
+            report("✅ Project structure is complete and correct")
             
         except Exception as e:
             self.fail(f"Project structure completeness test failed: {str(e)}")
@@ -392,8 +404,10 @@ class TestInstagramAgentFinal(unittest.TestCase):
                 'MAX_HASHTAGS'
             ]
             
-            for var in required_vars:
-                self.assertIn(var, config_content, f"Configuration variable {var} should be defined")
+            # Collect every upper-case identifier once and check the set
+            found = set(re.findall(r"[A-Z][A-Z0-9_]+", config_content))
+            missing = set(required_vars) - found
+            self.assertFalse(missing, f"Configuration variables should be defined: {sorted(missing)}")
             
             # Check for validation method
             self.assertIn('def validate', config_content, "Configuration should have validation method")
@@ -401,30 +415,14 @@ class TestInstagramAgentFinal(unittest.TestCase):
             # Check for proper class structure
             self.assertIn('class Config:', config_content, "Configuration should be a class")
             
-            print("✅ Configuration structure is correct")
+            report("✅ Configuration structure is correct")
             
         except Exception as e:
             self.fail(f"Configuration validation structure test failed: {str(e)}")
 
 def run_final_tests():
     """Run all final tests and return results."""
-    # Create test suite
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromTestCase(TestInstagramAgentFinal)
-    
-    # Run tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Return test results
-    return {
-        "tests_run": result.testsRun,
-        "failures": len(result.failures),
-        "errors": len(result.errors),
-        "success": result.wasSuccessful(),
-        "failure_details": [str(f[1]) for f in result.failures],
-        "error_details": [str(e[1]) for e in result.errors]
-    }
+    return run_tests(TestInstagramAgentFinal)
 
 if __name__ == "__main__":
     print("🧪 Running Final Instagram Advertisement Agent Tests")